@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def download(client, url):
+    response = client.get(url, buffered=False)
+    size = lines = 0
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    response.close()
+    return size, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a large account's export, then delete the account")
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--children', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=5000, help='tasks and rewards per child')
+    parser.add_argument('--points', type=int, default=20000, help='ledger entries per child')
+    args = parser.parse_args()
+
+    from seed import seed, _insert
+    path = os.path.join(tempfile.mkdtemp(), 'account.db')
+    print(f'seeding {path}...', flush=True)
+    seed('sqlite:///' + path, users=1, posts=args.posts, parents=1, children=args.children, tasks=args.tasks,
+         rewards=args.tasks)
+    from playwin import create_app, db
+    from playwin.models import User, Child, PointTransaction
+    from playwin.routes import remove_user
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, 'WTF_CSRF_ENABLED': False,
+                      'RECURRING_SCHEDULER': False})
+    with app.app_context():
+        with db.engine.begin() as connection:
+            _insert(connection, PointTransaction.__table__, (
+                dict(child_id=child, amount=1, description='Completed task', idempotency_key=f'{child}:{i}')
+                for child in range(1, args.children + 1) for i in range(args.points)))
+        db.session.query(Child).update({Child.points: args.points})
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'user1@demo.com', 'password': 'password'})
+    for url in ('/account/export.ndjson', '/account/export/posts.csv'):
+        started = time.perf_counter()
+        size, lines = download(client, url)
+        elapsed = time.perf_counter() - started
+        # a second pass under tracemalloc, which slows Python down too much to time it
+        tracemalloc.start()
+        download(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{url:>28}: {lines} lines, {size / 2 ** 20:.1f} MiB in {elapsed:.1f}s, '
+              f'peak Python memory {peak / 2 ** 20:.1f} MiB')
+
+    with app.app_context():
+        rows = {name: db.session.execute(f'SELECT count(*) FROM {name}').scalar()
+                for name in ('post', 'child', 'task', 'reward', 'point_transaction')}
+        started = time.perf_counter()
+        remove_user(User.query.filter_by(username='user1').one().id)
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+        left = sum(db.session.execute(f'SELECT count(*) FROM {name}').scalar() for name in rows)
+    print(f'deleted the account with {sum(rows.values())} rows ({rows}) in {elapsed:.1f}s, {left} rows left')
+    if left:
+        sys.exit('the account was not deleted completely')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwin import create_app, db, hasher
+from playwin.models import User, Child, Task
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single task submits vs. one batch request')
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--children', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+                      'WTF_CSRF_ENABLED': False, 'BCRYPT_LOG_ROUNDS': 4})
+    with app.app_context():
+        db.create_all()
+        parent = User(username='parent', email='parent@demo.com', password=hasher.generate_password_hash('password'))
+        db.session.add(parent)
+        db.session.commit()
+        db.session.add_all([Child(name=f'child {i}', parent_id=parent.id) for i in range(args.children)])
+        db.session.commit()
+        child_ids = [child.id for child in Child.query.all()]
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'parent@demo.com', 'password': 'password'})
+    items = [{'child_id': child_ids[i % len(child_ids)], 'name': f'task {i}', 'description': '', 'points_awarded': 1}
+             for i in range(args.tasks)]
+
+    start = time.perf_counter()
+    for item in items:
+        client.post(f"/child/{item['child_id']}/task/new", data=item)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.post('/children/tasks/new', json={'items': items})
+    batch = time.perf_counter() - start
+
+    with app.app_context():
+        created = Task.query.count()
+    print(f'{args.tasks} single submits: {single:.3f}s ({args.tasks / single:.0f} tasks/s)')
+    print(f'1 batch of {args.tasks}:       {batch:.3f}s ({args.tasks / batch:.0f} tasks/s)')
+    print(f'speedup {single / batch:.1f}x, {created} tasks created')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(mode, threads, requests, write_ratio):
+    from playwin import create_app, db, hasher
+    from playwin.models import User, Post
+
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+              'WTF_CSRF_ENABLED': False, 'BCRYPT_LOG_ROUNDS': 4, 'HASHER_WORKERS': 0, 'HASHER_MAX_PENDING': threads}
+    if mode == 'default':
+        config.update(SQLITE_PRAGMAS={}, SQLALCHEMY_READ_POOL_SIZE=0, SQLALCHEMY_WRITE_POOL_SIZE=0)
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='writer', email='writer@demo.com', password=hasher.generate_password_hash('password'))
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([Post(title=f'post {i}', content='content', user_id=user.id) for i in range(1000)])
+        db.session.commit()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        client.post('/login', data={'email': 'writer@demo.com', 'password': 'password'})
+        errors = 0
+        for i in range(requests):
+            if rng.random() < write_ratio:
+                response = client.post('/post/new', data={'title': f'new {seed}-{i}', 'content': 'content'})
+            else:
+                response = client.get('/home')
+            errors += response.status_code >= 500
+        return errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        errors = sum(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    print(f'{mode:>10} {threads * requests / elapsed:>10.1f} {errors:>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed read/write load: default SQLite vs. production mode')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100, help='requests per thread')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--mode', choices=['default', 'production'])
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.threads, args.requests, args.write_ratio)
+        return
+    print(f'{"mode":>10} {"req/s":>10} {"errors":>7}')
+    for mode in ('default', 'production'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--threads', str(args.threads),
+                        '--requests', str(args.requests), '--write-ratio', str(args.write_ratio)], check=True)
+
+
+if __name__ == '__main__':
+    main()
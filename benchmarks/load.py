@@ -0,0 +1,247 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIX = {'home': 25, 'post': 20, 'user_posts': 15, 'children': 10, 'child': 15, 'check_task': 10, 'login': 5}
+
+
+def serve(path, port):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(path)
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from playwin import create_app
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = create_app({'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET': None})
+    make_server('127.0.0.1', port, app, threaded=True, request_handler=Handler).serve_forever()
+
+
+class Client:
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, url, form=None, cookie=True, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if cookie and self.cookie:
+            headers['Cookie'] = self.cookie
+        self.connection.request(method, url, body, headers)
+        response = self.connection.getresponse()
+        response.read()
+        set_cookie = response.getheader('Set-Cookie')
+        if cookie and set_cookie and set_cookie.startswith('session='):
+            self.cookie = set_cookie.split(';', 1)[0]
+        return response.status
+
+    def login(self, email, cookie=True):
+        return self.request('POST', '/login', {'email': email, 'password': 'password'}, cookie=cookie)
+
+
+class Worker(threading.Thread):
+    def __init__(self, port, user, children, tasks, counts, deadline, warmup_until, rng_seed):
+        super().__init__(daemon=True)
+        self.client = Client(port)
+        self.user = user
+        self.children = children
+        self.tasks = tasks
+        self.counts = counts
+        self.deadline = deadline
+        self.warmup_until = warmup_until
+        self.rng = random.Random(rng_seed)
+        self.samples = {name: [] for name in MIX}
+        self.errors = {name: 0 for name in MIX}
+
+    def next_request(self, name):
+        rng = self.rng
+        if name == 'home':
+            return 'GET', '/home', None
+        if name == 'post':
+            return 'GET', f'/post/{rng.randint(1, self.counts["posts"])}', None
+        if name == 'user_posts':
+            return 'GET', f'/user/user{rng.randint(1, self.counts["users"])}', None
+        if name == 'children':
+            return 'GET', '/children', None
+        if name == 'child':
+            return 'GET', f'/child/{rng.choice(self.children)}', None
+        if name == 'check_task':
+            task_id, child_id = self.tasks.pop()
+            return 'POST', f'/child/{child_id}/task/{task_id}/complete', {}
+
+    def run(self):
+        while self.client.login(f'user{self.user}@demo.com') != 302:
+            time.sleep(0.1)
+        names, weights = zip(*MIX.items())
+        while time.perf_counter() < self.deadline:
+            name = self.rng.choices(names, weights)[0]
+            if name == 'check_task' and not self.tasks:
+                continue
+            started = time.perf_counter()
+            if name == 'login':
+                status = self.client.login(f'user{self.rng.randint(1, self.counts["users"])}@demo.com', cookie=False)
+            else:
+                method, url, form = self.next_request(name)
+                status = self.client.request(method, url, form, headers={'Idempotency-Key': uuid.uuid4().hex})
+            elapsed = time.perf_counter() - started
+            if started < self.warmup_until:
+                continue
+            self.samples[name].append(elapsed)
+            self.errors[name] += status >= 400
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run(path, concurrency, duration, warmup, port):
+    with sqlite3.connect(path) as connection:
+        counts = dict(users=connection.execute('SELECT max(id) FROM user').fetchone()[0],
+                      posts=connection.execute('SELECT max(id) FROM post').fetchone()[0])
+        parents = [row[0] for row in connection.execute(
+            'SELECT DISTINCT parent_id FROM child ORDER BY parent_id LIMIT ?', (concurrency,))]
+        if len(parents) < concurrency:
+            sys.exit(f'{path} has {len(parents)} parents, need one per client ({concurrency})')
+        owned = {}
+        for parent in parents:
+            children = [row[0] for row in connection.execute('SELECT id FROM child WHERE parent_id = ?', (parent,))]
+            tasks = connection.execute(
+                f'SELECT id, child_id FROM task WHERE child_id IN ({",".join("?" * len(children))})', children)
+            owned[parent] = (children, tasks.fetchall())
+
+    server = subprocess.Popen([sys.executable, __file__, '--serve', path, '--port', str(port)])
+    try:
+        while True:
+            if server.poll() is not None:
+                sys.exit('the app server failed to start')
+            try:
+                Client(port).request('GET', '/about')
+                break
+            except OSError:
+                time.sleep(0.1)
+        start = time.perf_counter()
+        workers = [Worker(port, parent, *owned[parent], counts, start + warmup + duration, start + warmup, i)
+                   for i, parent in enumerate(parents)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {}
+    for name in MIX:
+        samples = [sample for worker in workers for sample in worker.samples[name]]
+        results[name] = dict(requests=len(samples), rps=len(samples) / duration,
+                             p50=percentile(samples, 0.50) * 1000, p99=percentile(samples, 0.99) * 1000,
+                             errors=sum(worker.errors[name] for worker in workers))
+    return dict(counts=counts, concurrency=concurrency, duration=duration, routes=results)
+
+
+def compare(result, baseline, tolerance):
+    regressions = []
+    for name, current in result['routes'].items():
+        previous = baseline['routes'].get(name)
+        if not previous or not current['requests']:
+            continue
+        for key in ('p50', 'p99'):
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f'{name} {key} {previous[key]:.1f}ms -> {current[key]:.1f}ms')
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f'{name} throughput {previous["rps"]:.1f} -> {current["rps"]:.1f} req/s')
+        error_rate, previous_rate = (row['errors'] / max(row['requests'], 1) for row in (current, previous))
+        if error_rate > previous_rate * (1 + tolerance) + 0.01:
+            regressions.append(f'{name} error rate {previous_rate:.1%} -> {error_rate:.1%}')
+    return regressions
+
+
+def report(result, baseline):
+    print(f'{"route":>12} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7} {"base p99":>9}')
+    for name, row in result['routes'].items():
+        base = baseline['routes'].get(name, {}).get('p99') if baseline else None
+        base = f'{base:>9.1f}' if base is not None else f'{"-":>9}'
+        print(f'{name:>12} {row["requests"]:>9} {row["rps"]:>8.1f} {row["p50"]:>8.1f} {row["p99"]:>8.1f} '
+              f'{row["errors"]:>7} {base}')
+    total = sum(row['requests'] for row in result['routes'].values())
+    print(f'{"total":>12} {total:>9} {total / result["duration"]:>8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the playwin routes over HTTP and compare to a baseline')
+    parser.add_argument('--db', help='seeded database to reuse (see seed.py); a fresh one is seeded otherwise')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--parents', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before the run')
+    parser.add_argument('--port', type=int, help='port for the app server (default: any free port)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--serve', metavar='DB', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+    path = args.db
+    if path is None:
+        from seed import seed
+        path = os.path.join(tempfile.mkdtemp(), 'load.db')
+        print(f'seeding {path}...', flush=True)
+        seed('sqlite:///' + path, users=args.users, posts=args.posts, parents=args.parents)
+
+    result = run(path, args.concurrency, args.duration, args.warmup, args.port or free_port())
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'baseline written to {args.baseline}')
+    elif baseline is not None:
+        if baseline['counts'] != result['counts'] or baseline['concurrency'] != result['concurrency']:
+            print('warning: baseline was recorded with a different data volume or concurrency', file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
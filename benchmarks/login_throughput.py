@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwin import create_app, db, hasher
+from playwin.models import User
+
+
+def login(app, n):
+    client = app.test_client()
+    ok = 0
+    for _ in range(n):
+        response = client.post('/login', data={'email': 'bench@demo.com', 'password': 'password'})
+        ok += response.status_code == 302
+        client.get('/logout')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput vs. hashing pool size')
+    parser.add_argument('--pool-sizes', default='0,1,2,4,8')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=8, help='logins per client')
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+              'WTF_CSRF_ENABLED': False, 'BCRYPT_LOG_ROUNDS': args.rounds}
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@demo.com',
+                            password=hasher.generate_password_hash('password')))
+        db.session.commit()
+
+    print(f'{"workers":>8} {"logins/s":>10} {"rejected":>9}')
+    for workers in [int(size) for size in args.pool_sizes.split(',')]:
+        app = create_app(dict(config, HASHER_WORKERS=workers, HASHER_MAX_PENDING=max(4 * workers, args.clients)))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            ok = sum(pool.map(login, [app] * args.clients, [args.logins] * args.clients))
+        elapsed = time.perf_counter() - start
+        total = args.clients * args.logins
+        print(f'{workers:>8} {ok / elapsed:>10.1f} {total - ok:>9}')
+        hasher.shutdown(app)
+
+
+if __name__ == '__main__':
+    main()
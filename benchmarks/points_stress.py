@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwin import create_app, db, hasher
+from playwin.models import User, Child, Task, Reward, PointTransaction
+
+
+def client(app):
+    c = app.test_client()
+    c.post('/login', data={'email': 'parent@demo.com', 'password': 'password'})
+    return c
+
+
+def hammer(app, child_id, task_ids, reward_ids, seed):
+    rng = random.Random(seed)
+    c = client(app)
+    statuses = []
+    for kind, item_id in rng.sample([('task', i) for i in task_ids] + [('reward', i) for i in reward_ids],
+                                    len(task_ids) + len(reward_ids)):
+        action = 'complete' if kind == 'task' else 'buy'
+        response = c.post(f'/child/{child_id}/{kind}/{item_id}/{action}')
+        statuses.append(response.status_code)
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hammer one child with concurrent completions and purchases')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--rewards', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+                      'WTF_CSRF_ENABLED': False, 'BCRYPT_LOG_ROUNDS': 4, 'HASHER_WORKERS': 0,
+                      'HASHER_MAX_PENDING': args.threads})
+    with app.app_context():
+        db.create_all()
+        parent = User(username='parent', email='parent@demo.com', password=hasher.generate_password_hash('password'))
+        db.session.add(parent)
+        db.session.commit()
+        child = Child(name='child', parent_id=parent.id)
+        db.session.add(child)
+        db.session.commit()
+        db.session.add_all([Task(name=f'task {i}', description='', points_awarded=random.randint(1, 5),
+                                 child_id=child.id) for i in range(args.tasks)])
+        db.session.add_all([Reward(name=f'reward {i}', description='', points_required=random.randint(1, 5),
+                                   child_id=child.id) for i in range(args.rewards)])
+        db.session.commit()
+        child_id = child.id
+        task_ids = [task.id for task in Task.query.all()]
+        reward_ids = [reward.id for reward in Reward.query.all()]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(hammer, [app] * args.threads, [child_id] * args.threads, [task_ids] * args.threads,
+                                [reward_ids] * args.threads, range(args.threads)))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        points = Child.query.get(child_id).points
+        ledger_total = db.session.query(db.func.sum(PointTransaction.amount)).scalar() or 0
+        completed = Task.query.count()
+        bought = Reward.query.count()
+    requests = sum(len(statuses) for statuses in results)
+    errors = sum(status >= 500 for statuses in results for status in statuses)
+    print(f'{requests} requests in {elapsed:.2f}s ({requests / elapsed:.0f} req/s), {errors} errors')
+    print(f'balance {points}, ledger total {ledger_total}, '
+          f'{args.tasks - completed} tasks completed, {args.rewards - bought} rewards bought')
+    if points != ledger_total or points < 0 or completed:
+        print('FAILED: balance does not match the ledger')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Materialize recurring tasks for every child within a time window')
+    parser.add_argument('--db', help='seeded database to reuse (see seed.py --templates); seeded otherwise')
+    parser.add_argument('--children', type=int, default=1000000)
+    parser.add_argument('--templates', type=int, default=1, help='recurring task templates per child')
+    parser.add_argument('--batch-size', type=int, help='templates per transaction (default: RECURRING_BATCH_SIZE)')
+    parser.add_argument('--window', type=float, default=60, help='seconds the first run has to finish in')
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        from seed import seed
+        path = os.path.join(tempfile.mkdtemp(), 'recurring.db')
+        print(f'seeding {path}...', flush=True)
+        parents = max(1, args.children // 10)
+        seed('sqlite:///' + path, users=parents, posts=0, parents=parents, children=args.children // parents,
+             tasks=0, rewards=0, templates=args.templates)
+    from playwin import create_app, db, recurring
+    from playwin.models import TaskTemplate
+
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(path), 'RECURRING_SCHEDULER': False}
+    if args.batch_size:
+        config['RECURRING_BATCH_SIZE'] = args.batch_size
+    app = create_app(config)
+    today = date.today()
+    with app.app_context():
+        templates = db.session.query(db.func.count(TaskTemplate.id)).scalar()
+        print(f'{templates} templates, batches of {app.config["RECURRING_BATCH_SIZE"]}')
+        created, elapsed = timed(recurring.materialize, today)
+        print(f'first run:  {created} tasks in {elapsed:.1f}s ({created / elapsed:.0f} tasks/s)')
+        repeated, repeat_elapsed = timed(recurring.materialize, today)
+        print(f'second run: {repeated} tasks in {repeat_elapsed:.1f}s (same day, must be 0)')
+        skipped, skip_elapsed = timed(recurring.materialize, today + timedelta(days=1))
+        print(f'next day:   {skipped} tasks in {skip_elapsed:.1f}s (previous instances still open)')
+    if repeated:
+        sys.exit('materialization is not idempotent')
+    if elapsed > args.window:
+        sys.exit(f'first run took {elapsed:.1f}s, over the {args.window:.0f}s window')
+
+
+if __name__ == '__main__':
+    main()
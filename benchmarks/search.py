@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load import percentile
+
+QUERIES = {
+    'common word': 'play',
+    'mid word': 'garden',
+    'two words': 'garden book',
+    'rare word': 'pepepe',
+    'no match': 'nothinglikethis',
+}
+
+
+def measure(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return percentile(samples, 0.50) * 1000, percentile(samples, 0.99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search latency against the LIKE scan it replaces')
+    parser.add_argument('--db', help='seeded database to reuse (see seed.py); a fresh one is seeded otherwise')
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--like-repeat', type=int, default=3)
+    parser.add_argument('--rank-window', type=int, default=None, help='SEARCH_RANK_WINDOW (default: rank every match)')
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        from seed import seed
+        path = os.path.join(tempfile.mkdtemp(), 'search.db')
+        print(f'seeding {path}...', flush=True)
+        seed('sqlite:///' + path, users=10000, posts=args.posts, parents=1, children=1, tasks=1, rewards=1)
+    from playwin import create_app, db, post_search
+    from playwin.models import Post
+    from playwin.search import match_expression
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(path),
+                      'SEARCH_RANK_WINDOW': args.rank_window})
+    with app.app_context():
+        print(f'{db.session.query(db.func.count(Post.id)).scalar()} posts')
+        print(f'{"query":>16} {"page":>5} {"matches":>8} {"p50 ms":>8} {"p99 ms":>8}')
+        for name, query in QUERIES.items():
+            matches = db.session.execute('SELECT count(*) FROM post_fts WHERE post_fts MATCH :match',
+                                         {'match': match_expression(query)}).scalar()
+            for page in (1, 5):
+                p50, p99 = measure(lambda: post_search.search(query, page), args.repeat)
+                print(f'{name:>16} {page:>5} {matches:>8} {p50:>8.1f} {p99:>8.1f}')
+
+        for name in ('mid word', 'rare word', 'no match'):
+            pattern = f'%{QUERIES[name]}%'
+            query = Post.query.filter(Post.title.like(pattern) | Post.content.like(pattern)).order_by(
+                Post.date_posted.desc()).limit(11)
+            p50, p99 = measure(query.all, args.like_repeat)
+            print(f'{"LIKE " + name:>16} {1:>5} {"-":>8} {p50:>8.1f} {p99:>8.1f}')
+
+        started = time.perf_counter()
+        post_search.rebuild()
+        print(f'rebuild-search-index: {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 20000
+SCHEDULES = ('* * *', '* * *', '* * *', '* * 1', '* * 6', '* * 1-5', '1,15 * *')
+WORDS = ('play', 'win', 'task', 'reward', 'child', 'points', 'clean', 'room', 'homework', 'garden', 'read', 'book')
+SYLLABLES = ('ka', 'lo', 'mi', 'ta', 're', 'su', 'no', 'vi', 'da', 'pe')
+# Zipf-distributed vocabulary: a few very common words and a long tail of rare ones, as in real text
+VOCABULARY = WORDS + tuple(a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES)
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def _insert(connection, table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            connection.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(table.insert(), chunk)
+
+
+@contextmanager
+def _triggers_suspended(connection, table):
+    """Drop `table`'s triggers for a bulk load and restore them afterwards (SQLite cannot disable them)."""
+    triggers = connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)).fetchall()
+    for name, _ in triggers:
+        connection.execute(f'DROP TRIGGER {name}')
+    yield
+    for _, sql in triggers:
+        connection.execute(sql)
+
+
+def _texts(rng, words, count=1000):
+    return [' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words)) for _ in range(count)]
+
+
+def seed(uri, users=100000, posts=1000000, parents=500, children=10, tasks=200, rewards=200, templates=0,
+         rng_seed=42):
+    """Create a database at `uri` with the given volume; returns the row counts.
+
+    Ids are assigned in insertion order, so user `n` is `user{n}` and owns children
+    `(n - 1) * children + 1 .. n * children`. Every user's password is `password`. Recurring task templates
+    are due today.
+    """
+    from flask_migrate import upgrade
+    from playwin import create_app, db, hasher, post_search
+    from playwin.models import User, Post, Child, Task, TaskTemplate, Reward
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'RECURRING_SCHEDULER': False})
+    rng = random.Random(rng_seed)
+    start = datetime(2020, 1, 1)
+    today = date.today()
+    titles, contents, names, descriptions = (_texts(rng, words) for words in (4, 40, 2, 8))
+    with app.app_context():
+        password = hasher.generate_password_hash('password')
+        upgrade(directory=app.extensions['migrate'].directory)
+        with db.engine.begin() as connection:
+            sqlite = connection.dialect.name == 'sqlite'
+            if sqlite:
+                connection.execute('PRAGMA synchronous=OFF')
+            _insert(connection, User.__table__, (
+                dict(username=f'user{i}', email=f'user{i}@demo.com', image_file='default.jpg', password=password)
+                for i in range(1, users + 1)))
+            # the full-text index is rebuilt in one pass below, much faster than its per-row triggers
+            with _triggers_suspended(connection, 'post') if sqlite else nullcontext():
+                _insert(connection, Post.__table__, (
+                    dict(title=rng.choice(titles), content=rng.choice(contents), user_id=rng.randint(1, users),
+                         date_posted=start + timedelta(seconds=i * 30))
+                    for i in range(posts)))
+            _insert(connection, Child.__table__, (
+                dict(name=f'child{j}', picture='default.jpg', parent_id=parent, points=0)
+                for parent in range(1, parents + 1) for j in range(children)))
+            _insert(connection, Task.__table__, (
+                dict(name=rng.choice(names), description=rng.choice(descriptions), points_awarded=rng.randint(1, 20),
+                     child_id=child)
+                for child in range(1, parents * children + 1) for _ in range(tasks)))
+            _insert(connection, Reward.__table__, (
+                dict(name=rng.choice(names), description=rng.choice(descriptions), points_required=rng.randint(0, 200),
+                     child_id=child)
+                for child in range(1, parents * children + 1) for _ in range(rewards)))
+            _insert(connection, TaskTemplate.__table__, (
+                dict(name=rng.choice(names), description=rng.choice(descriptions), points_awarded=rng.randint(1, 20),
+                     child_id=child, schedule=rng.choice(SCHEDULES), next_due=today)
+                for child in range(1, parents * children + 1) for _ in range(templates)))
+        if sqlite:
+            post_search.rebuild()
+    return dict(users=users, posts=posts, children=parents * children, tasks=parents * children * tasks,
+                rewards=parents * children * rewards, templates=parents * children * templates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-seed a benchmark database')
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--parents', type=int, default=500, help='users that get children')
+    parser.add_argument('--children', type=int, default=10, help='children per parent')
+    parser.add_argument('--tasks', type=int, default=200, help='tasks per child')
+    parser.add_argument('--rewards', type=int, default=200, help='rewards per child')
+    parser.add_argument('--templates', type=int, default=0, help='recurring task templates per child')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f'{args.path} already exists')
+    if args.parents > args.users:
+        parser.error('--parents cannot exceed --users')
+    started = time.perf_counter()
+    counts = seed('sqlite:///' + os.path.abspath(args.path), args.users, args.posts, args.parents, args.children,
+                  args.tasks, args.rewards, args.templates)
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+    print(f'{rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
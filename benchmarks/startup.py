@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# only the code paths that use them should pay for these
+DEFERRED = ('PIL', 'flask_mail')
+
+
+def measure(apps):
+    started = time.perf_counter()
+    from playwin import create_app
+    imported = time.perf_counter()
+    folder = tempfile.mkdtemp()
+    for i in range(apps):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(folder, f'app{i}.db')})
+    created = time.perf_counter()
+    with app.test_request_context('/'):
+        app.preprocess_request()
+    print(json.dumps({'import': imported - started, 'create': (created - imported) / apps,
+                      'loaded': [name for name in DEFERRED if name in sys.modules]}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import and application factory cost in fresh interpreters')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--apps', type=int, default=10, help='apps built per interpreter')
+    parser.add_argument('--budget', type=float, default=None, help='fail if import + create_app exceeds this (ms)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.apps)
+        return
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, __file__, '--child', '--apps', str(args.apps)], check=True,
+                                stdout=subprocess.PIPE).stdout
+        samples.append(dict(json.loads(output), process=time.perf_counter() - started))
+    imports, creates, processes = ([sample[key] * 1000 for sample in samples]
+                                   for key in ('import', 'create', 'process'))
+    print(f'import playwin:      p50 {statistics.median(imports):6.1f} ms, max {max(imports):6.1f} ms')
+    print(f'create_app():        p50 {statistics.median(creates):6.1f} ms, max {max(creates):6.1f} ms')
+    print(f'interpreter to exit: p50 {statistics.median(processes):6.1f} ms')
+    loaded = sorted({name for sample in samples for name in sample['loaded']})
+    print(f'deferred modules loaded at startup: {", ".join(loaded) or "none"}')
+    total = statistics.median(imports) + statistics.median(creates)
+    if loaded:
+        sys.exit(f'{", ".join(loaded)} should not be imported until first use')
+    if args.budget is not None and total > args.budget:
+        sys.exit(f'startup took {total:.0f} ms, over the {args.budget:.0f} ms budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""add outgoing_mail and point_transaction
+
+Revision ID: 442cecc70b45
+Revises: e448de6b13db
+Create Date: 2026-10-17 09:14:03.117529
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '442cecc70b45'
+down_revision = 'e448de6b13db'
+branch_labels = None
+depends_on = None
+
+
+def _missing_index(inspector, table, name):
+    return name not in {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    # databases used before the migrations existed may already have these tables from db.create_all()
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    if 'outgoing_mail' not in tables:
+        _create_outgoing_mail()
+    if _missing_index(inspector, 'outgoing_mail', 'ix_outgoing_mail_next_attempt'):
+        op.create_index(op.f('ix_outgoing_mail_next_attempt'), 'outgoing_mail', ['next_attempt'], unique=False)
+    if 'point_transaction' not in tables:
+        _create_point_transaction()
+    if _missing_index(inspector, 'point_transaction', 'ix_point_transaction_child_id'):
+        op.create_index(op.f('ix_point_transaction_child_id'), 'point_transaction', ['child_id'], unique=False)
+
+
+def _create_outgoing_mail():
+    op.create_table('outgoing_mail',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('sender', sa.String(length=120), nullable=False),
+    sa.Column('recipients', sa.Text(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _create_point_transaction():
+    op.create_table('point_transaction',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('child_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(length=100), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['child_id'], ['child.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_point_transaction_child_id'), table_name='point_transaction')
+    op.drop_table('point_transaction')
+    op.drop_index(op.f('ix_outgoing_mail_next_attempt'), table_name='outgoing_mail')
+    op.drop_table('outgoing_mail')
@@ -0,0 +1,74 @@
+"""cascade deletes
+
+Revision ID: 4d57484e83bf
+Revises: 75e9773d16b3
+Create Date: 2026-10-17 12:31:01.687176
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d57484e83bf'
+down_revision = '75e9773d16b3'
+branch_labels = None
+depends_on = None
+
+# names the foreign keys the initial schema left unnamed, so batch mode can drop them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+FOREIGN_KEYS = [
+    ('child', 'parent_id', 'user', 'CASCADE'),
+    ('post', 'user_id', 'user', 'CASCADE'),
+    ('task', 'child_id', 'child', 'CASCADE'),
+    ('task', 'template_id', 'task_template', 'SET NULL'),
+    ('task_template', 'child_id', 'child', 'CASCADE'),
+    ('reward', 'child_id', 'child', 'CASCADE'),
+    ('point_transaction', 'child_id', 'child', 'CASCADE'),
+]
+# keys an earlier migration already created under their fk_ name rather than leaving PostgreSQL to name them
+NAMED_KEYS = {('task', 'template_id')}
+
+
+def _recreate_post_fts_triggers():
+    # batch mode rebuilds `post`, which drops the full-text triggers along with the old table
+    op.execute('DROP TRIGGER IF EXISTS post_fts_insert')
+    op.execute('DROP TRIGGER IF EXISTS post_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS post_fts_update')
+    op.execute("CREATE TRIGGER post_fts_insert AFTER INSERT ON post BEGIN "
+               "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+    op.execute("CREATE TRIGGER post_fts_delete AFTER DELETE ON post BEGIN "
+               "INSERT INTO post_fts(post_fts, rowid, title, content) "
+               "VALUES ('delete', old.id, old.title, old.content); END")
+    op.execute("CREATE TRIGGER post_fts_update AFTER UPDATE OF title, content ON post BEGIN "
+               "INSERT INTO post_fts(post_fts, rowid, title, content) "
+               "VALUES ('delete', old.id, old.title, old.content); "
+               "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+
+
+def _existing_name(dialect, table, column, referred):
+    # PostgreSQL named the initial schema's keys itself; batch mode only renames them on SQLite
+    if dialect == 'postgresql' and (table, column) not in NAMED_KEYS:
+        return f'{table}_{column}_fkey'
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _replace_foreign_keys(cascade):
+    dialect = op.get_bind().dialect.name
+    for table in dict.fromkeys(table for table, _, _, _ in FOREIGN_KEYS):
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for _, column, referred, ondelete in (key for key in FOREIGN_KEYS if key[0] == table):
+                name = f'fk_{table}_{column}_{referred}'
+                old_name = _existing_name(dialect, table, column, referred) if cascade else name
+                batch_op.drop_constraint(old_name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete if cascade else None)
+    if dialect == 'sqlite':
+        _recreate_post_fts_triggers()
+
+
+def upgrade():
+    _replace_foreign_keys(cascade=True)
+
+
+def downgrade():
+    _replace_foreign_keys(cascade=False)
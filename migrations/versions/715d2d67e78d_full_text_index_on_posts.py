@@ -0,0 +1,55 @@
+"""full-text index on posts
+
+Revision ID: 715d2d67e78d
+Revises: c27276f68e37
+Create Date: 2026-10-17 11:02:41.538214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '715d2d67e78d'
+down_revision = 'c27276f68e37'
+branch_labels = None
+depends_on = None
+
+
+# PostgreSQL ranks with tsvector over an expression GIN index that playwin/search.py repeats verbatim
+POST_DOCUMENT = ("setweight(to_tsvector('english', title), 'A') || "
+                 "setweight(to_tsvector('english', content), 'B')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(f'CREATE INDEX ix_post_search ON post USING gin (({POST_DOCUMENT}))')
+        return
+    if dialect != 'sqlite':
+        return
+    op.execute("CREATE VIRTUAL TABLE post_fts USING fts5("
+               "title, content, content='post', content_rowid='id', tokenize='porter unicode61')")
+    op.execute("CREATE TRIGGER post_fts_insert AFTER INSERT ON post BEGIN "
+               "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+    op.execute("CREATE TRIGGER post_fts_delete AFTER DELETE ON post BEGIN "
+               "INSERT INTO post_fts(post_fts, rowid, title, content) "
+               "VALUES ('delete', old.id, old.title, old.content); END")
+    op.execute("CREATE TRIGGER post_fts_update AFTER UPDATE OF title, content ON post BEGIN "
+               "INSERT INTO post_fts(post_fts, rowid, title, content) "
+               "VALUES ('delete', old.id, old.title, old.content); "
+               "INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+    op.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX ix_post_search')
+        return
+    if dialect != 'sqlite':
+        return
+    op.execute('DROP TRIGGER post_fts_update')
+    op.execute('DROP TRIGGER post_fts_delete')
+    op.execute('DROP TRIGGER post_fts_insert')
+    op.execute('DROP TABLE post_fts')
@@ -0,0 +1,43 @@
+"""statistics rollups
+
+Revision ID: 75e9773d16b3
+Revises: 8b2e30dd014c
+Create Date: 2026-10-17 12:26:52.804113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '75e9773d16b3'
+down_revision = '8b2e30dd014c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stats_rollup',
+    sa.Column('scope', sa.String(length=6), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('start', sa.Date(), nullable=False),
+    sa.Column('points_earned', sa.Integer(), nullable=False),
+    sa.Column('points_spent', sa.Integer(), nullable=False),
+    sa.Column('tasks_completed', sa.Integer(), nullable=False),
+    sa.Column('rewards_bought', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'owner_id', 'period', 'start')
+    )
+    op.create_table('stats_streak',
+    sa.Column('scope', sa.String(length=6), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.Column('last_active', sa.Date(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'owner_id')
+    )
+
+
+def downgrade():
+    op.drop_table('stats_streak')
+    op.drop_table('stats_rollup')
@@ -0,0 +1,51 @@
+"""recurring task templates
+
+Revision ID: 8b2e30dd014c
+Revises: 715d2d67e78d
+Create Date: 2026-10-17 11:48:09.316027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e30dd014c'
+down_revision = '715d2d67e78d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_template',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('child_id', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.Column('points_awarded', sa.Integer(), nullable=False),
+    sa.Column('schedule', sa.String(length=50), nullable=False),
+    sa.Column('next_due', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['child_id'], ['child.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('task_template', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_task_template_child_id'), ['child_id'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('due_on', sa.Date(), nullable=True))
+        batch_op.create_unique_constraint('uq_task_template_id_due_on', ['template_id', 'due_on'])
+        batch_op.create_foreign_key('fk_task_template_id_task_template', 'task_template', ['template_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_task_template_id_task_template', type_='foreignkey')
+        batch_op.drop_constraint('uq_task_template_id_due_on', type_='unique')
+        batch_op.drop_column('due_on')
+        batch_op.drop_column('template_id')
+
+    with op.batch_alter_table('task_template', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_task_template_child_id'))
+
+    op.drop_table('task_template')
@@ -0,0 +1,29 @@
+"""point transaction kind
+
+Revision ID: a3c5e1f7b9d2
+Revises: 4d57484e83bf
+Create Date: 2026-10-17 14:05:12.419330
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e1f7b9d2'
+down_revision = '4d57484e83bf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('point_transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=10), server_default='adjustment', nullable=False))
+    # rows written before the column only say what they were in their description
+    op.execute("UPDATE point_transaction SET kind = 'task' WHERE description LIKE 'Completed %'")
+    op.execute("UPDATE point_transaction SET kind = 'reward' WHERE description LIKE 'Bought %'")
+
+
+def downgrade():
+    with op.batch_alter_table('point_transaction', schema=None) as batch_op:
+        batch_op.drop_column('kind')
@@ -0,0 +1,38 @@
+"""scope idempotency keys to the child
+
+Revision ID: b7d1f04c2e91
+Revises: a3c5e1f7b9d2
+Create Date: 2026-10-17 16:20:44.902175
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1f04c2e91'
+down_revision = 'a3c5e1f7b9d2'
+branch_labels = None
+depends_on = None
+
+# names the unique constraint 442cecc70b45 left unnamed, so batch mode can drop it on SQLite
+NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _global_key_name():
+    if op.get_bind().dialect.name == 'postgresql':
+        return 'point_transaction_idempotency_key_key'
+    return 'uq_point_transaction_idempotency_key'
+
+
+def upgrade():
+    with op.batch_alter_table('point_transaction', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(_global_key_name(), type_='unique')
+        batch_op.create_unique_constraint('uq_point_transaction_child_id_idempotency_key',
+                                          ['child_id', 'idempotency_key'])
+
+
+def downgrade():
+    with op.batch_alter_table('point_transaction', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('uq_point_transaction_child_id_idempotency_key', type_='unique')
+        batch_op.create_unique_constraint(_global_key_name(), ['idempotency_key'])
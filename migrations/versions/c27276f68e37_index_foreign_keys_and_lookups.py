@@ -0,0 +1,32 @@
+"""index foreign keys and lookups
+
+Revision ID: c27276f68e37
+Revises: 442cecc70b45
+Create Date: 2026-10-17 09:15:26.402190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27276f68e37'
+down_revision = '442cecc70b45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_child_parent_id_name', 'child', ['parent_id', 'name'], unique=False)
+    op.create_index('ix_post_date_posted_id', 'post', ['date_posted', 'id'], unique=False)
+    op.create_index('ix_post_user_id_date_posted', 'post', ['user_id', 'date_posted'], unique=False)
+    op.create_index(op.f('ix_reward_child_id'), 'reward', ['child_id'], unique=False)
+    op.create_index(op.f('ix_task_child_id'), 'task', ['child_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_task_child_id'), table_name='task')
+    op.drop_index(op.f('ix_reward_child_id'), table_name='reward')
+    op.drop_index('ix_post_user_id_date_posted', table_name='post')
+    op.drop_index('ix_post_date_posted_id', table_name='post')
+    op.drop_index('ix_child_parent_id_name', table_name='child')
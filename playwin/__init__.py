@@ -1,23 +1,91 @@
 import os
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-from flask_mail import Mail
+from flask_migrate import Migrate
+from playwin.database import Database
+from playwin.querycount import QueryCounter
+from playwin.metrics import Metrics
+from playwin.cache import PageCache
+from playwin.identity import IdentityCache
+from playwin.hashing import PasswordHasher
+from playwin.mailer import MailDispatcher
+from playwin.images import ImagePipeline
+from playwin.assets import Assets
+from playwin.queryplan import QueryPlanChecker
+from playwin.events import EventBus
+from playwin.search import PostSearch
+from playwin.recurring import RecurringTasks
+from playwin.export import AccountExport
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = '5791628bb0b13ce0c676dfde280ba245'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+db = Database()
+hasher = PasswordHasher()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
-app.config['MAIL_SERVER'] = 'smtp.googlemail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('DB_EMAIL')
-app.config['MAIL_PASSWORD'] = os.environ.get('DB_PASSWORD')
-mail = Mail(app)
+login_manager.blueprint_login_views['api'] = None
+mail_dispatcher = MailDispatcher()
+page_cache = PageCache()
+identity = IdentityCache()
+images = ImagePipeline()
+events = EventBus()
+post_search = PostSearch()
+recurring = RecurringTasks()
+account_export = AccountExport()
 
-from playwin import routes
\ No newline at end of file
+
+def create_app(config=None):
+    """Build an application instance; `config` is a mapping that overrides the defaults and the environment.
+
+    Extensions keep their per-application state on the app, so differently configured instances can live
+    in one process. Heavy optional dependencies (PIL, Flask-Mail) are only imported on first use.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = '5791628bb0b13ce0c676dfde280ba245'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
+    app.config['SQLALCHEMY_READ_DATABASE_URI'] = os.environ.get('DATABASE_READ_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    app.config['MAIL_SERVER'] = 'smtp.googlemail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = os.environ.get('DB_EMAIL')
+    app.config['MAIL_PASSWORD'] = os.environ.get('DB_PASSWORD')
+    app.config['MAIL_BACKEND'] = os.environ.get('MAIL_BACKEND', 'smtp')
+    app.config['QUERY_BUDGET'] = {'main.home': 3, 'main.post': 3, 'main.user_posts': 4, 'main.child': 2,
+                                  'main.children': 2, 'main.search': 1, 'main.child_stats': 3,
+                                  'main.family_stats': 3}
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED') == '1'
+    app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'lru')
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
+    if 'EVENTS_ENABLED' in os.environ:
+        app.config['EVENTS_ENABLED'] = os.environ['EVENTS_ENABLED'] == '1'
+    app.config['EVENTS_BACKEND'] = os.environ.get('EVENTS_BACKEND', 'local')
+    app.config['EVENTS_REDIS_URL'] = os.environ.get('EVENTS_REDIS_URL')
+    app.config.from_mapping(config or {})
+
+    db.init_app(app)
+    Migrate(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'), render_as_batch=True)
+    hasher.init_app(app)
+    login_manager.init_app(app)
+    mail_dispatcher.init_app(app, db)
+    QueryCounter(app)
+    Metrics(app)
+    page_cache.init_app(app)
+    identity.init_app(app, page_cache)
+    Assets(app)
+    images.init_app(app)
+    QueryPlanChecker(app, db)
+    events.init_app(app)
+    post_search.init_app(app, db)
+    recurring.init_app(app, db)
+    account_export.init_app(app, db)
+
+    from playwin import stats
+    from playwin.routes import main
+    from playwin.api import api
+
+    app.cli.add_command(stats.rebuild_stats_command)
+    app.register_blueprint(main)
+    app.register_blueprint(api)
+    return app
@@ -0,0 +1,403 @@
+from datetime import datetime
+from flask import Blueprint, abort, jsonify, request
+from flask_login import current_user, login_required, login_user, logout_user
+from werkzeug.exceptions import HTTPException
+from playwin import db, hasher, identity, page_cache, post_search
+from playwin import ledger, stats
+from playwin.forms import PostForm, ChildForm, TaskForm, RewardForm
+from playwin.models import User, Post, Child, Task, Reward, PointTransaction
+from playwin.pagination import keyset_paginate
+from playwin.search import highlight
+from playwin.routes import (authorize_child, child_events, export_account, export_account_section, password_confirmed,
+                            publish_points, publish_added, publish_removed, remove_children, remove_user)
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+POST_FIELDS = {
+    'id': Post.id,
+    'title': Post.title,
+    'content': Post.content,
+    'date_posted': Post.date_posted,
+    'user_id': Post.user_id,
+    'author': User.username,
+}
+CHILD_FIELDS = {'id': Child.id, 'name': Child.name, 'picture': Child.picture, 'points': Child.points}
+TASK_FIELDS = {'id': Task.id, 'child_id': Task.child_id, 'name': Task.name, 'description': Task.description,
+               'points_awarded': Task.points_awarded}
+REWARD_FIELDS = {'id': Reward.id, 'child_id': Reward.child_id, 'name': Reward.name,
+                 'description': Reward.description, 'points_required': Reward.points_required}
+MAX_LIMIT = 100
+
+api.add_url_rule('/children/<int:child_id>/events', 'child_events', child_events)
+api.add_url_rule('/account/export', 'export_account', export_account)
+api.add_url_rule('/account/export/<string:section>.csv', 'export_account_section', export_account_section)
+
+
+@api.errorhandler(HTTPException)
+def api_error(error):
+    return jsonify(error=error.name, message=error.description), error.code
+
+
+@api.errorhandler(ledger.LedgerError)
+def ledger_error(error):
+    db.session.rollback()
+    if isinstance(error, ledger.InsufficientPoints):
+        return jsonify(error='Conflict', message='Not enough points.'), 409
+    if isinstance(error, ledger.NegativeAmount):
+        return jsonify(error='Bad Request', message='Points must not be negative.'), 400
+    return jsonify(error='Conflict', message='Already processed.'), 409
+
+
+def _fields(available):
+    requested = request.args.get('fields')
+    if not requested:
+        return list(available)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        abort(400, f'Unknown fields: {", ".join(unknown)}')
+    return names
+
+
+def _limit():
+    return max(1, min(request.args.get('limit', 20, type=int), MAX_LIMIT))
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _serialize(row, names):
+    return {name: _value(getattr(row, name)) for name in names}
+
+
+def _columns(available, names, *required):
+    return [available[name].label(name) for name in dict.fromkeys(list(required) + names)]
+
+
+def _respond(payload, status=200):
+    response = jsonify(payload)
+    response.status_code = status
+    if request.method == 'GET':
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+    return response
+
+
+def _form(form_class, obj=None):
+    if not request.is_json:
+        abort(415, 'Send a JSON body.')
+    form = form_class(obj=obj, meta={'csrf': False})
+    if not form.validate():
+        return None, (jsonify(error='Bad Request', fields=form.errors), 400)
+    return form, None
+
+
+def _id_page(model, available, *criteria):
+    names = _fields(available)
+    per_page = _limit()
+    query = db.session.query(*_columns(available, names, 'id')).filter(*criteria)
+    after = request.args.get('after', type=int)
+    if after:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(per_page + 1).all()
+    items = rows[:per_page]
+    return _respond(dict(items=[_serialize(row, names) for row in items],
+                         next=str(items[-1].id) if len(rows) > per_page else None))
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    data = request.get_json(silent=True) or {}
+    user = User.query.filter_by(email=str(data.get('email', ''))).first()
+    if user is None or not hasher.check_password_hash(user.password, str(data.get('password', ''))):
+        abort(401, 'Invalid email or password.')
+    login_user(user, remember=bool(data.get('remember')))
+    identity.store(user)
+    return _respond(dict(id=user.id, username=user.username, email=user.email, image_file=user.image_file))
+
+
+@api.route('/logout', methods=['POST'])
+def logout():
+    logout_user()
+    identity.clear()
+    return '', 204
+
+
+def _confirm_password():
+    if not password_confirmed(str((request.get_json(silent=True) or {}).get('password', ''))):
+        abort(403, 'Confirm with the account password.')
+
+
+@api.route('/account', methods=['DELETE'])
+@login_required
+def delete_account():
+    _confirm_password()
+    remove_user(current_user.id)
+    db.session.commit()
+    identity.invalidate(current_user)
+    logout_user()
+    identity.clear()
+    page_cache.invalidate_all()
+    return '', 204
+
+
+@api.route('/posts')
+def posts():
+    names = _fields(POST_FIELDS)
+    query = db.session.query(*_columns(POST_FIELDS, names, 'id', 'date_posted'))
+    if 'author' in names:
+        query = query.join(User, User.id == Post.user_id)
+    if request.args.get('user_id', type=int):
+        query = query.filter(Post.user_id == request.args.get('user_id', type=int))
+    page = keyset_paginate(query, Post.date_posted, Post.id, per_page=_limit(),
+                           after=request.args.get('after'), before=request.args.get('before'))
+    return _respond(dict(items=[_serialize(row, names) for row in page.items],
+                         next=page.next_cursor, prev=page.prev_cursor))
+
+
+@api.route('/posts/search')
+def search_posts():
+    results = post_search.search(request.args.get('q', ''), request.args.get('page', 1, type=int))
+    items = [dict(_serialize(row, ('id', 'title', 'date_posted', 'author')), snippet=highlight(row.snippet))
+             for row in results.items]
+    return _respond(dict(items=items, page=results.page, has_next=results.has_next))
+
+
+@api.route('/posts/<int:post_id>')
+def post(post_id):
+    names = _fields(POST_FIELDS)
+    row = db.session.query(*_columns(POST_FIELDS, names)).select_from(Post).join(
+        User, User.id == Post.user_id).filter(Post.id == post_id).first_or_404()
+    return _respond(_serialize(row, names))
+
+
+@api.route('/posts', methods=['POST'])
+@login_required
+def new_post():
+    form, error = _form(PostForm)
+    if error:
+        return error
+    post = Post(title=form.title.data, content=form.content.data, user_id=current_user.id)
+    db.session.add(post)
+    db.session.commit()
+    page_cache.invalidate('feed')
+    return _respond(_serialize(post, [name for name in POST_FIELDS if name != 'author']), 201)
+
+
+@api.route('/posts/<int:post_id>', methods=['PATCH'])
+@login_required
+def update_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    if post.user_id != current_user.id:
+        abort(403)
+    form, error = _form(PostForm, post)
+    if error:
+        return error
+    post.title = form.title.data
+    post.content = form.content.data
+    db.session.commit()
+    page_cache.invalidate('feed')
+    page_cache.invalidate(f'post:{post.id}')
+    return _respond(_serialize(post, [name for name in POST_FIELDS if name != 'author']))
+
+
+@api.route('/posts/<int:post_id>', methods=['DELETE'])
+@login_required
+def delete_post(post_id):
+    user_id = db.session.query(Post.user_id).filter_by(id=post_id).scalar()
+    if user_id is None:
+        abort(404)
+    if user_id != current_user.id:
+        abort(403)
+    Post.query.filter_by(id=post_id).delete(synchronize_session=False)
+    db.session.commit()
+    page_cache.invalidate('feed')
+    page_cache.invalidate(f'post:{post_id}')
+    return '', 204
+
+
+@api.route('/children')
+@login_required
+def children():
+    return _id_page(Child, CHILD_FIELDS, Child.parent_id == current_user.id)
+
+
+@api.route('/children/<int:child_id>')
+@login_required
+def child(child_id):
+    names = _fields(CHILD_FIELDS)
+    row = db.session.query(Child.parent_id, *_columns(CHILD_FIELDS, names)).filter(
+        Child.id == child_id).first_or_404()
+    if row.parent_id != current_user.id:
+        abort(403)
+    return _respond(_serialize(row, names))
+
+
+@api.route('/children', methods=['POST'])
+@login_required
+def add_child():
+    form, error = _form(ChildForm)
+    if error:
+        return error
+    child = Child(name=form.name.data, parent_id=current_user.id, points=0)
+    db.session.add(child)
+    db.session.commit()
+    return _respond(_serialize(child, CHILD_FIELDS), 201)
+
+
+@api.route('/children/<int:child_id>', methods=['PATCH'])
+@login_required
+def update_child(child_id):
+    child = Child.query.get_or_404(child_id)
+    if child.parent_id != current_user.id:
+        abort(403)
+    form, error = _form(ChildForm, child)
+    if error:
+        return error
+    child.name = form.name.data
+    db.session.commit()
+    return _respond(_serialize(child, CHILD_FIELDS))
+
+
+@api.route('/children/<int:child_id>', methods=['DELETE'])
+@login_required
+def remove_child(child_id):
+    authorize_child(child_id)
+    _confirm_password()
+    remove_children([child_id])
+    db.session.commit()
+    return '', 204
+
+
+@api.route('/children/<int:child_id>/tasks')
+@login_required
+def tasks(child_id):
+    authorize_child(child_id)
+    return _id_page(Task, TASK_FIELDS, Task.child_id == child_id)
+
+
+@api.route('/children/<int:child_id>/rewards')
+@login_required
+def rewards(child_id):
+    authorize_child(child_id)
+    return _id_page(Reward, REWARD_FIELDS, Reward.child_id == child_id)
+
+
+@api.route('/children/<int:child_id>/tasks', methods=['POST'])
+@login_required
+def add_task(child_id):
+    authorize_child(child_id)
+    form, error = _form(TaskForm)
+    if error:
+        return error
+    task = Task(name=form.name.data, description=form.description.data,
+                points_awarded=form.points_awarded.data or 0, child_id=child_id)
+    db.session.add(task)
+    db.session.commit()
+    item = _serialize(task, TASK_FIELDS)
+    publish_added('task', child_id, item)
+    return _respond(item, 201)
+
+
+@api.route('/children/<int:child_id>/rewards', methods=['POST'])
+@login_required
+def add_reward(child_id):
+    authorize_child(child_id)
+    form, error = _form(RewardForm)
+    if error:
+        return error
+    reward = Reward(name=form.name.data, description=form.description.data,
+                    points_required=form.points_required.data or 0, child_id=child_id)
+    db.session.add(reward)
+    db.session.commit()
+    item = _serialize(reward, REWARD_FIELDS)
+    publish_added('reward', child_id, item)
+    return _respond(item, 201)
+
+
+@api.route('/children/<int:child_id>/tasks/<int:task_id>', methods=['DELETE'])
+@login_required
+def remove_task(child_id, task_id):
+    authorize_child(child_id)
+    if not Task.query.filter_by(id=task_id, child_id=child_id).delete(synchronize_session=False):
+        abort(404)
+    db.session.commit()
+    publish_removed('task', [(task_id, child_id)])
+    return '', 204
+
+
+@api.route('/children/<int:child_id>/rewards/<int:reward_id>', methods=['DELETE'])
+@login_required
+def remove_reward(child_id, reward_id):
+    authorize_child(child_id)
+    if not Reward.query.filter_by(id=reward_id, child_id=child_id).delete(synchronize_session=False):
+        abort(404)
+    db.session.commit()
+    publish_removed('reward', [(reward_id, child_id)])
+    return '', 204
+
+
+@api.route('/children/<int:child_id>/stats')
+@login_required
+def child_stats(child_id):
+    authorize_child(child_id)
+    return _respond(stats.summary('child', child_id))
+
+
+@api.route('/stats')
+@login_required
+def family_stats():
+    return _respond(dict(stats.summary('family', current_user.id), leaderboard=stats.leaderboard(current_user.id)))
+
+
+def _idempotency_key():
+    return request.headers.get('Idempotency-Key', '')[:40] or None
+
+
+def _child_state(child_id):
+    row = db.session.query(*_columns(CHILD_FIELDS, list(CHILD_FIELDS))).filter(Child.id == child_id).one()
+    return _respond(_serialize(row, CHILD_FIELDS))
+
+
+def _replayed(child_id, key):
+    """A retried call whose item is already gone returns the child as the first call left it."""
+    if key is None or not db.session.query(PointTransaction.id).filter_by(
+            child_id=child_id, idempotency_key=key).first():
+        abort(404)
+    return _child_state(child_id)
+
+
+@api.route('/children/<int:child_id>/tasks/<int:task_id>/complete', methods=['POST'])
+@login_required
+def complete_task(child_id, task_id):
+    authorize_child(child_id)
+    key = _idempotency_key()
+    task = db.session.query(Task.id, Task.child_id, Task.name, Task.points_awarded).filter_by(
+        id=task_id, child_id=child_id).first()
+    if task is None:
+        return _replayed(child_id, key and ledger.item_key(key, 'task', task_id))
+    ledger.complete_task(task, key)
+    db.session.commit()
+    publish_points([child_id])
+    publish_removed('task', [(task_id, child_id)])
+    return _child_state(child_id)
+
+
+@api.route('/children/<int:child_id>/rewards/<int:reward_id>/buy', methods=['POST'])
+@login_required
+def buy_reward(child_id, reward_id):
+    authorize_child(child_id)
+    key = _idempotency_key()
+    reward = db.session.query(Reward.id, Reward.child_id, Reward.name, Reward.points_required).filter_by(
+        id=reward_id, child_id=child_id).first()
+    if reward is None:
+        return _replayed(child_id, key and ledger.item_key(key, 'reward', reward_id))
+    ledger.buy_reward(reward, key)
+    db.session.commit()
+    publish_points([child_id])
+    publish_removed('reward', [(reward_id, child_id)])
+    return _child_state(child_id)
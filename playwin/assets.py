@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import abort, request, send_file, url_for, make_response
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt')
+FINGERPRINTED = re.compile(r'^(?P<name>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$')
+SOURCE_MAP = re.compile(rb'^\s*(//|/\*)# sourceMappingURL=.*$', re.MULTILINE)
+
+DEFAULT_BUNDLES = {
+    'site.css': ['vendor/bootstrap.min.css', 'main.css'],
+    'site.js': ['vendor/jquery.min.js', 'vendor/popper.min.js', 'vendor/bootstrap.min.js'],
+}
+
+
+class Assets:
+    def __init__(self, app=None):
+        self._manifest = {}
+        self._bundle_mtimes = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_URL_PATH', '/assets')
+        app.config.setdefault('ASSETS_CACHE_FOLDER', os.path.join(app.instance_path, 'assets'))
+        app.config.setdefault('ASSETS_BUNDLES', DEFAULT_BUNDLES)
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        app.config.setdefault('ASSETS_X_ACCEL_PREFIX', None)
+        self.app = app
+        self.static_folder = app.static_folder
+        self.cache_folder = app.config['ASSETS_CACHE_FOLDER']
+        app.extensions['assets'] = self
+        app.jinja_env.globals['asset_url'] = self.url
+        app.add_url_rule(app.config['ASSETS_URL_PATH'] + '/<path:filename>', 'asset', self.serve)
+
+        @app.cli.command('build-assets')
+        def build_assets_command():
+            """Fingerprint, bundle and precompress the static assets."""
+            self.build()
+
+        self.build()
+
+    def build(self):
+        os.makedirs(self.cache_folder, exist_ok=True)
+        for bundle in self.app.config['ASSETS_BUNDLES']:
+            self._build_bundle(bundle)
+        for root, dirs, files in os.walk(self.static_folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if filename.endswith(COMPRESSIBLE):
+                    self.fingerprint(os.path.relpath(path, self.static_folder).replace(os.sep, '/'))
+
+    def _build_bundle(self, bundle):
+        sources = [os.path.join(self.static_folder, source) for source in self.app.config['ASSETS_BUNDLES'][bundle]]
+        mtime = max(os.path.getmtime(source) for source in sources)
+        if self._bundle_mtimes.get(bundle) == mtime:
+            return self._manifest[bundle]
+        content = b'\n'.join(SOURCE_MAP.sub(b'', self._read(source)) for source in sources)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        path = os.path.join(self.cache_folder, digest + os.path.splitext(bundle)[1])
+        self._write(path, content)
+        self._add(bundle, path, digest)
+        self._bundle_mtimes[bundle] = mtime
+        return self._manifest[bundle]
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _write(path, content):
+        if os.path.exists(path):
+            return
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _add(self, filename, path, digest):
+        if filename.endswith(COMPRESSIBLE):
+            content = self._read(path)
+            self._write(os.path.join(self.cache_folder, digest + '.gz'), gzip.compress(content, 9, mtime=0))
+            if brotli is not None:
+                self._write(os.path.join(self.cache_folder, digest + '.br'), brotli.compress(content))
+        with self._lock:
+            self._manifest[filename] = (path, digest)
+
+    def fingerprint(self, filename):
+        entry = self._manifest.get(filename)
+        if entry is not None and not self.app.debug:
+            return entry
+        if filename in self.app.config['ASSETS_BUNDLES']:
+            return self._build_bundle(filename)
+        path = safe_join(self.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        digest = hashlib.sha256(self._read(path)).hexdigest()[:12]
+        if entry is None or entry[1] != digest:
+            self._add(filename, path, digest)
+        return self._manifest[filename]
+
+    def url(self, filename):
+        entry = self.fingerprint(filename)
+        if entry is None:
+            return url_for('static', filename=filename)
+        name, ext = os.path.splitext(filename)
+        return url_for('asset', filename=f'{name}.{entry[1]}{ext}')
+
+    def serve(self, filename):
+        match = FINGERPRINTED.match(filename)
+        if match is None:
+            abort(404)
+        entry = self.fingerprint(match.group('name') + match.group('ext'))
+        if entry is None or entry[1] != match.group('digest'):
+            abort(404)
+        path, digest = entry
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        prefix = self.app.config['ASSETS_X_ACCEL_PREFIX']
+        if prefix and path.startswith(self.static_folder):
+            response = make_response('')
+            response.mimetype = mimetype
+            response.headers['X-Accel-Redirect'] = prefix + os.path.relpath(path, self.static_folder)
+        else:
+            encoding = None
+            accepted = request.accept_encodings
+            for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+                compressed = os.path.join(self.cache_folder, digest + suffix)
+                if accepted[candidate] and os.path.exists(compressed):
+                    path, encoding = compressed, candidate
+                    break
+            response = send_file(path, mimetype=mimetype, add_etags=False)
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = f"public, max-age={self.app.config['ASSETS_MAX_AGE']}, immutable"
+        return response.make_conditional(request)
@@ -0,0 +1,134 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+
+
+class LRUCache:
+    """Per-process cache: entries expire after `timeout` seconds, so other workers that never see an
+    invalidation still stop serving a page once it is that old.
+
+    Versions are drawn from one counter and only the `maxsize` most recently bumped namespaces are kept; a
+    forgotten namespace reports the highest version forgotten so far, which is never older than its own.
+    """
+
+    def __init__(self, maxsize=512, timeout=300):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._clock = 0
+        self._version_floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, self._version_floor)
+
+    def bump_version(self, namespace):
+        with self._lock:
+            self._clock += 1
+            self._versions[namespace] = self._clock
+            self._versions.move_to_end(namespace)
+            while len(self._versions) > self.maxsize:
+                _, version = self._versions.popitem(last=False)
+                self._version_floor = max(self._version_floor, version)
+
+
+class RedisCache:
+    def __init__(self, url, timeout=300):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.timeout = timeout
+
+    def get(self, key):
+        value = self._client.get('page:' + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self._client.set('page:' + key, pickle.dumps(value), ex=self.timeout)
+
+    def get_version(self, namespace):
+        return int(self._client.get('version:' + namespace) or 0)
+
+    def bump_version(self, namespace):
+        self._client.incr('version:' + namespace)
+
+
+class PageCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_TYPE', 'lru')
+        app.config.setdefault('CACHE_MAXSIZE', 512)
+        app.config.setdefault('CACHE_REDIS_URL', None)
+        app.config.setdefault('CACHE_TIMEOUT', 300)
+        if app.config['CACHE_TYPE'] == 'redis':
+            app.extensions['page_cache'] = RedisCache(app.config['CACHE_REDIS_URL'], app.config['CACHE_TIMEOUT'])
+        else:
+            app.extensions['page_cache'] = LRUCache(app.config['CACHE_MAXSIZE'], app.config['CACHE_TIMEOUT'])
+
+    @property
+    def backend(self):
+        return current_app.extensions['page_cache']
+
+    def invalidate(self, namespace):
+        self.backend.bump_version(namespace)
+
+    def invalidate_all(self):
+        self.backend.bump_version('*')
+
+    def cached(self, namespace):
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if current_user.is_authenticated or session.get('_flashes'):
+                    return f(*args, **kwargs)
+                backend = self.backend
+                ns = namespace.format(**kwargs)
+                key = f"{ns}:{backend.get_version('*')}.{backend.get_version(ns)}:{request.full_path}"
+                entry = backend.get(key)
+                if entry is None:
+                    body = f(*args, **kwargs)
+                    if not isinstance(body, str):
+                        return body
+                    entry = {
+                        'body': body,
+                        'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                        'last_modified': datetime.utcnow().replace(microsecond=0),
+                    }
+                    backend.set(key, entry)
+                response = make_response(entry['body'])
+                response.set_etag(entry['etag'])
+                response.last_modified = entry['last_modified']
+                response.cache_control.no_cache = True
+                response.vary.add('Cookie')
+                return response.make_conditional(request)
+            return decorated_function
+        return decorator
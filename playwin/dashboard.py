@@ -0,0 +1,35 @@
+from collections import namedtuple
+from sqlalchemy import literal
+from playwin import db
+from playwin.models import Task, Reward
+
+TaskRow = namedtuple('TaskRow', 'id name description points_awarded')
+RewardRow = namedtuple('RewardRow', 'id name description points_required')
+
+
+class ItemPage:
+    def __init__(self, items, per_page):
+        self.items = items[:per_page]
+        self.next_cursor = self.items[-1].id if len(items) > per_page else None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _items(model, kind, points, child_id, after, per_page):
+    query = db.session.query(
+        literal(kind).label('kind'), model.id, model.name, model.description, points.label('points')
+    ).filter(model.child_id == child_id)
+    if after:
+        query = query.filter(model.id > after)
+    return db.session.query(query.order_by(model.id).limit(per_page + 1).subquery())
+
+
+def load_child_items(child_id, task_after=None, reward_after=None, per_page=100):
+    rows = _items(Task, 'task', Task.points_awarded, child_id, task_after, per_page).union_all(
+        _items(Reward, 'reward', Reward.points_required, child_id, reward_after, per_page)
+    ).all()
+    tasks = [TaskRow(row.id, row.name, row.description, row.points) for row in rows if row.kind == 'task']
+    rewards = [RewardRow(row.id, row.name, row.description, row.points) for row in rows if row.kind == 'reward']
+    return ItemPage(sorted(tasks), per_page), ItemPage(sorted(rewards), per_page)
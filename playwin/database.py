@@ -0,0 +1,99 @@
+import threading
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import Select, CompoundSelect
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'foreign_keys': 'ON',
+}
+
+
+def _is_sqlite_file(sa_url):
+    return sa_url.drivername.startswith('sqlite') and sa_url.database not in (None, '', ':memory:')
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if isinstance(clause, (Select, CompoundSelect)) and not self._flushing and not self.info.get('wrote'):
+            return self.db.get_read_engine(self.app)
+        self.info['wrote'] = True
+        return super().get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+
+class Database(SQLAlchemy):
+    def __init__(self, *args, **kwargs):
+        self._read_engines = {}
+        self._read_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_READ_DATABASE_URI', None)
+        app.config.setdefault('SQLALCHEMY_READ_POOL_SIZE', 5)
+        app.config.setdefault('SQLALCHEMY_WRITE_POOL_SIZE', 1)
+        app.config.setdefault('SQLALCHEMY_WRITE_POOL_TIMEOUT', 30)
+        app.config.setdefault('SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+        super().init_app(app)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        reader = options.pop('reader', False)
+        if _is_sqlite_file(sa_url):
+            pool_size = options.pop('pool_size', app.config['SQLALCHEMY_WRITE_POOL_SIZE'])
+            if pool_size:
+                options.update(pool_size=pool_size, poolclass=QueuePool)
+                options.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+                if not reader:
+                    # SQLite takes one writer at a time, so extra writers wait here instead of on the file lock
+                    options.update(max_overflow=0, pool_timeout=app.config['SQLALCHEMY_WRITE_POOL_TIMEOUT'])
+        if sa_url.drivername.startswith('sqlite'):
+            options['sqlite_pragmas'] = app.config['SQLITE_PRAGMAS']
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        pragmas = engine_opts.pop('sqlite_pragmas', None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if pragmas:
+            @event.listens_for(engine, 'connect')
+            def set_sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name}={value}')
+                cursor.close()
+        return engine
+
+    def get_read_engine(self, app=None):
+        app = self.get_app(app)
+        uri = app.config['SQLALCHEMY_READ_DATABASE_URI']
+        key = (app, app.config['SQLALCHEMY_DATABASE_URI'], uri)
+        with self._read_lock:
+            engine = self._read_engines.get(key)
+            if engine is not None:
+                return engine
+            if not app.config['SQLALCHEMY_READ_POOL_SIZE']:
+                return self.get_engine(app)
+            if uri is None:
+                if not _is_sqlite_file(make_url(app.config['SQLALCHEMY_DATABASE_URI'])):
+                    return self.get_engine(app)
+                uri = app.config['SQLALCHEMY_DATABASE_URI']
+            options = {'pool_size': app.config['SQLALCHEMY_READ_POOL_SIZE'], 'reader': True}
+            sa_url, options = self.apply_driver_hacks(app, make_url(uri), options)
+            engine = self._read_engines[key] = self.create_engine(sa_url, options)
+            return engine
@@ -0,0 +1,152 @@
+import json
+import queue
+import sys
+import threading
+from collections import defaultdict
+from flask import Response, current_app
+
+
+class TooManyListeners(Exception):
+    pass
+
+
+def async_worker():
+    """Whether gevent or eventlet has patched threading, so a stream blocked in Queue.get only parks a greenlet."""
+    gevent = sys.modules.get('gevent.monkey')
+    if gevent is not None and gevent.is_module_patched('threading'):
+        return True
+    eventlet = sys.modules.get('eventlet.patcher')
+    return eventlet is not None and eventlet.is_monkey_patched('thread')
+
+
+class LocalBackend:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscriber = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers[channel].discard(subscriber)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+
+class RedisBackend(LocalBackend):
+    """Publishes through Redis; one listener thread per process fans messages out to local subscribers."""
+
+    def __init__(self, url, queue_size=100):
+        import redis
+        super().__init__(queue_size)
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, channel):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events', daemon=True)
+                self._listener.start()
+        return super().subscribe(channel)
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe('events:*')
+        for item in pubsub.listen():
+            self.deliver(item['channel'].decode('utf-8')[len('events:'):], item['data'].decode('utf-8'))
+
+    def publish(self, channel, message):
+        self._client.publish('events:' + channel, message)
+
+
+class _EventState:
+    def __init__(self, config):
+        if config['EVENTS_BACKEND'] == 'redis':
+            self.backend = RedisBackend(config['EVENTS_REDIS_URL'], config['EVENTS_QUEUE_SIZE'])
+        else:
+            self.backend = LocalBackend(config['EVENTS_QUEUE_SIZE'])
+        self.heartbeat = config['EVENTS_HEARTBEAT']
+        self.slots = threading.BoundedSemaphore(config['EVENTS_MAX_LISTENERS'])
+
+
+class EventBus:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_ENABLED', None)
+        app.config.setdefault('EVENTS_BACKEND', 'local')
+        app.config.setdefault('EVENTS_REDIS_URL', None)
+        app.config.setdefault('EVENTS_QUEUE_SIZE', 100)
+        app.config.setdefault('EVENTS_HEARTBEAT', 15)
+        app.config.setdefault('EVENTS_MAX_LISTENERS', 1000)
+        app.extensions['events'] = _EventState(app.config)
+
+    @property
+    def enabled(self):
+        """EVENTS_ENABLED, or when it is None whether this process runs under an async worker.
+
+        Checked per request because gunicorn patches the worker after a preloaded app was created.
+        """
+        enabled = current_app.config['EVENTS_ENABLED']
+        return async_worker() if enabled is None else enabled
+
+    @property
+    def backend(self):
+        return current_app.extensions['events'].backend
+
+    def publish(self, channel, event, **data):
+        self.backend.publish(channel, json.dumps(dict(event=event, data=data)))
+
+    def stream(self, channel, *initial):
+        """Relay `channel` as text/event-stream, starting with the `initial` (event, data) pairs.
+
+        The generator blocks in Queue.get, so it is only served when `enabled`: under a monkey-patched gevent
+        or eventlet worker every idle listener is a parked greenlet, and EVENTS_MAX_LISTENERS caps them.
+        """
+        state = current_app.extensions['events']
+        if not state.slots.acquire(blocking=False):
+            raise TooManyListeners()
+        subscriber = state.backend.subscribe(channel)
+        closed = threading.Lock()
+
+        def close():
+            if closed.acquire(blocking=False):
+                state.backend.unsubscribe(channel, subscriber)
+                state.slots.release()
+
+        def generate():
+            yield f'retry: {state.heartbeat * 1000}\n\n'
+            for event, data in initial:
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+            while True:
+                try:
+                    message = json.loads(subscriber.get(timeout=state.heartbeat))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {message["event"]}\ndata: {json.dumps(message["data"])}\n\n'
+
+        response = Response(generate(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.call_on_close(close)
+        return response
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+from datetime import date
+from urllib.parse import quote
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import bindparam, select
+from werkzeug.utils import cached_property, secure_filename
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _disposition(filename):
+    # usernames can hold quotes or characters a Latin-1 header cannot carry; browsers that read RFC 5987
+    # `filename*` get the name as it is, the rest a sanitized ASCII one
+    fallback = secure_filename(filename)
+    if fallback == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class AccountExport:
+    """Streams everything an account owns as NDJSON, or one section of it as CSV.
+
+    Each section is a single SELECT read through `fetchmany` in EXPORT_CHUNK_SIZE rows (with a server-side
+    cursor where the driver has one) and written out chunk by chunk, so memory stays flat however many
+    posts or ledger entries the account has.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('EXPORT_CHUNK_SIZE', 1000)
+        self.db = db
+
+    @cached_property
+    def sections(self):
+        from playwin.models import User, Post, Child, Task, TaskTemplate, Reward, PointTransaction
+        user_id = bindparam('user_id')
+
+        def owned(*columns):
+            table = columns[0].class_.__table__
+            return select(columns).select_from(table.join(Child.__table__)).where(Child.parent_id == user_id)
+
+        return {
+            'account': select([User.id, User.username, User.email, User.image_file]).where(User.id == user_id),
+            'posts': select([Post.id, Post.title, Post.content, Post.date_posted]).where(
+                Post.user_id == user_id).order_by(Post.date_posted),
+            'children': select([Child.id, Child.name, Child.picture, Child.points]).where(Child.parent_id == user_id),
+            'tasks': owned(Task.id, Task.child_id, Task.name, Task.description, Task.points_awarded, Task.due_on),
+            'recurring_tasks': owned(TaskTemplate.id, TaskTemplate.child_id, TaskTemplate.name,
+                                     TaskTemplate.description, TaskTemplate.points_awarded, TaskTemplate.schedule,
+                                     TaskTemplate.next_due),
+            'rewards': owned(Reward.id, Reward.child_id, Reward.name, Reward.description, Reward.points_required),
+            'points': owned(PointTransaction.id, PointTransaction.child_id, PointTransaction.amount,
+                            PointTransaction.description, PointTransaction.date_created),
+        }
+
+    def _chunks(self, statement, user_id):
+        result = self.db.session.execute(statement.execution_options(stream_results=True), {'user_id': user_id})
+        try:
+            while True:
+                rows = result.fetchmany(current_app.config['EXPORT_CHUNK_SIZE'])
+                if not rows:
+                    return
+                yield result.keys(), rows
+        finally:
+            result.close()
+
+    def _response(self, chunks, mimetype, filename):
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+        response.headers['Content-Disposition'] = _disposition(filename)
+        response.cache_control.private = True
+        response.cache_control.no_store = True
+        return response
+
+    def stream_ndjson(self, user_id, filename='playwin.ndjson'):
+        """Every section, one JSON object per line tagged with its section name."""
+        sections = self.sections
+
+        def generate():
+            for section, statement in sections.items():
+                for keys, rows in self._chunks(statement, user_id):
+                    yield ''.join(json.dumps({'section': section, **dict(zip(keys, map(_value, row)))}) + '\n'
+                                  for row in rows)
+
+        return self._response(generate(), 'application/x-ndjson', filename)
+
+    def stream_csv(self, user_id, section, filename=None):
+        """One section as CSV with a header row; None if there is no such section."""
+        statement = self.sections.get(section)
+        if statement is None:
+            return None
+
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(statement.c.keys())
+            for _, rows in self._chunks(statement, user_id):
+                writer.writerows([_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+
+        return self._response(generate(), 'text/csv', filename or f'playwin-{section}.csv')
@@ -1,9 +1,12 @@
+from datetime import date
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from flask_login import current_user
-from wtforms import StringField, PasswordField, SubmitField, BooleanField, TextAreaField, IntegerField
-from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
+from wtforms import (StringField, PasswordField, SubmitField, BooleanField, TextAreaField, IntegerField,
+                     SelectMultipleField)
+from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError, Optional, NumberRange
 from playwin.models import User
+from playwin.recurring import normalize, ScheduleError
 
 
 class RegistrationForm(FlaskForm):
@@ -77,6 +80,11 @@ class ResetPasswordForm(FlaskForm):
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Reset Password')
 
+class ConfirmDeleteForm(FlaskForm):
+    password = PasswordField('Confirm with your password', validators=[DataRequired()])
+    submit = SubmitField('Delete')
+
+
 class ChildForm(FlaskForm):
     name = StringField("What is your child's name?", validators=[DataRequired()])
     picture = FileField('Update Child Picture', validators=[FileAllowed(['jpg', 'png'])])
@@ -85,11 +93,28 @@ class ChildForm(FlaskForm):
 class TaskForm(FlaskForm):
     name = StringField("Task name", validators=[DataRequired()])
     description = TextAreaField("Task description(Optional)")
-    points_awarded = IntegerField("Points awarded")
+    points_awarded = IntegerField("Points awarded", validators=[Optional(), NumberRange(min=0)])
     submit = SubmitField('Add Task')
 
+class RecurringTaskForm(TaskForm):
+    schedule = StringField('Repeat: "daily", "weekly" or day-of-month month day-of-week, like cron',
+                           default='daily', validators=[DataRequired()])
+    submit = SubmitField('Add Recurring Task')
+
+    def validate_schedule(self, schedule):
+        try:
+            normalize(schedule.data, date.today())
+        except ScheduleError as e:
+            raise ValidationError(str(e))
+
 class RewardForm(FlaskForm):
     name = StringField("Reward name", validators=[DataRequired()])
     description = TextAreaField("Reward description(Optional)")
-    points_required = IntegerField("Points required")
-    submit = SubmitField('Add Reward')
\ No newline at end of file
+    points_required = IntegerField("Points required", validators=[Optional(), NumberRange(min=0)])
+    submit = SubmitField('Add Reward')
+
+class BatchTaskForm(TaskForm):
+    children = SelectMultipleField("Children", coerce=int, validators=[DataRequired()])
+
+class BatchRewardForm(RewardForm):
+    children = SelectMultipleField("Children", coerce=int, validators=[DataRequired()])
\ No newline at end of file
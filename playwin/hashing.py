@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import bcrypt
+from flask import current_app
+from playwin.metrics import timed
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(pw_hash, password):
+    return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+
+
+def _mp_context():
+    # the web server is already threaded by the time the pool starts, and forking a threaded process can
+    # leave the child holding a lock no thread will ever release
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def hash_rounds(pw_hash):
+    return int(pw_hash.split('$')[2])
+
+
+class _HasherState:
+    def __init__(self, config):
+        self.rounds = config['BCRYPT_LOG_ROUNDS']
+        self.workers = config['HASHER_WORKERS']
+        self.timeout = config['HASHER_TIMEOUT']
+        self.slots = threading.BoundedSemaphore(max(config['HASHER_MAX_PENDING'], 1))
+        self.executor = None
+
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        app.config.setdefault('HASHER_WORKERS', os.cpu_count() or 1)
+        app.config.setdefault('HASHER_MAX_PENDING', 4 * max(app.config['HASHER_WORKERS'], 1))
+        app.config.setdefault('HASHER_TIMEOUT', 10)
+        app.extensions['hasher'] = _HasherState(app.config)
+
+    @staticmethod
+    def _state(app=None):
+        return (app or current_app).extensions['hasher']
+
+    def _get_executor(self, state):
+        with self._lock:
+            if state.executor is None:
+                state.executor = ProcessPoolExecutor(max_workers=state.workers, mp_context=_mp_context())
+            return state.executor
+
+    def shutdown(self, app=None):
+        state = self._state(app)
+        with self._lock:
+            if state.executor is not None:
+                state.executor.shutdown()
+                state.executor = None
+
+    def _run(self, fn, *args):
+        state = self._state()
+        if not state.slots.acquire(blocking=False):
+            raise HasherBusy()
+        if not state.workers:
+            try:
+                return fn(*args)
+            finally:
+                state.slots.release()
+        try:
+            future = self._get_executor(state).submit(fn, *args)
+        except Exception:
+            state.slots.release()
+            raise
+        future.add_done_callback(lambda f: state.slots.release())
+        try:
+            return future.result(timeout=state.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def generate_password_hash(self, password):
+        with timed('bcrypt'):
+            return self._run(_hash_password, password, self._state().rounds)
+
+    def check_password_hash(self, pw_hash, password):
+        with timed('bcrypt'):
+            return self._run(_check_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self._state().rounds
@@ -0,0 +1,66 @@
+import time
+from flask import current_app, session
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    def __init__(self, id, username, email, image_file):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.image_file = image_file
+
+    def __repr__(self):
+        return f"CachedUser('{self.username}', '{self.email}', '{self.image_file}')"
+
+
+class IdentityCache:
+    """Keeps the logged-in user's id and version in the session so authenticated requests skip the user query.
+
+    The profile itself lives in the page cache backend under that version, never in the cookie. An entry is
+    trusted for IDENTITY_CACHE_TTL seconds and only while the user's version is unchanged; `invalidate` bumps
+    it for every session of the user. The bump only reaches other worker processes through a shared backend
+    (`CACHE_TYPE=redis`); with the in-process LRU another worker can trust a stale profile for up to the TTL.
+    """
+
+    def __init__(self, app=None, page_cache=None):
+        if app is not None:
+            self.init_app(app, page_cache)
+
+    def init_app(self, app, page_cache):
+        app.config.setdefault('IDENTITY_CACHE_TTL', 60)
+        self.page_cache = page_cache
+
+    def _version(self, user_id):
+        return self.page_cache.backend.get_version(f'user:{user_id}')
+
+    @staticmethod
+    def _key(user_id, version):
+        return f'identity:{user_id}:{version}'
+
+    def get(self, user_id):
+        entry = session.get('_identity')
+        now = time.time()
+        if entry is None or entry['id'] != user_id or entry['expires'] < now:
+            return None
+        version = self._version(user_id)
+        if entry['version'] != version:
+            return None
+        profile = self.page_cache.backend.get(self._key(user_id, version))
+        if profile is None or profile[-1] < now:
+            return None
+        return CachedUser(user_id, *profile[:-1])
+
+    def store(self, user):
+        version = self._version(user.id)
+        expires = time.time() + current_app.config['IDENTITY_CACHE_TTL']
+        self.page_cache.backend.set(self._key(user.id, version),
+                                    (user.username, user.email, user.image_file, expires))
+        session['_identity'] = dict(id=user.id, version=version, expires=expires)
+        return CachedUser(user.id, user.username, user.email, user.image_file)
+
+    def invalidate(self, user):
+        self.page_cache.backend.bump_version(f'user:{user.id}')
+
+    def clear(self):
+        session.pop('_identity', None)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.utils import cached_property
+from playwin.metrics import timed
+
+SIZES = (64, 125, 250)
+DEFAULT_SIZE = 125
+PLACEHOLDER = 'default.jpg'
+
+
+class _PipelineState:
+    def __init__(self, config):
+        self.folder = config['IMAGE_FOLDER']
+        self.staging = config['IMAGE_UPLOAD_FOLDER']
+        self.workers = config['IMAGE_WORKERS']
+        self.executor = None
+        self.pending = set()
+        self.ready = set()
+
+
+class ImagePipeline:
+    """Resizes uploaded profile pictures off the request thread.
+
+    Raw uploads wait in IMAGE_UPLOAD_FOLDER, outside the served static folder; only the re-encoded variants
+    are written to IMAGE_FOLDER.
+
+    Pillow is imported by the first upload rather than at startup, since most requests only need
+    `picture_url`.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_WORKERS', 2)
+        app.config.setdefault('IMAGE_FOLDER', os.path.join(app.root_path, 'static', 'profile_pics'))
+        app.config.setdefault('IMAGE_UPLOAD_FOLDER', tempfile.gettempdir())
+        app.extensions['images'] = _PipelineState(app.config)
+        app.jinja_env.globals['picture_url'] = self.picture_url
+
+    @cached_property
+    def formats(self):
+        from PIL import Image
+        Image.init()
+        return [fmt for fmt in ('webp', 'avif') if fmt.upper() in Image.SAVE]
+
+    def _get_executor(self, state):
+        with self._lock:
+            if state.executor is None:
+                state.executor = ThreadPoolExecutor(max_workers=state.workers, thread_name_prefix='images')
+            return state.executor
+
+    @staticmethod
+    def variant(filename, size=DEFAULT_SIZE, fmt=None):
+        name, ext = os.path.splitext(filename)
+        suffix = '' if size == DEFAULT_SIZE else f'_{size}'
+        return f"{name}{suffix}.{fmt or ext.lstrip('.')}"
+
+    def is_ready(self, filename):
+        state = current_app.extensions['images']
+        if filename in state.ready:
+            return True
+        if os.path.exists(os.path.join(state.folder, filename)):
+            state.ready.add(filename)
+            return True
+        return False
+
+    def picture_url(self, filename, size=DEFAULT_SIZE, fmt=None):
+        if filename != PLACEHOLDER:
+            variant = self.variant(filename, size, fmt)
+            if self.is_ready(variant):
+                return current_app.extensions['assets'].url('profile_pics/' + variant)
+        if fmt is not None:
+            return None
+        return current_app.extensions['assets'].url('profile_pics/' + PLACEHOLDER)
+
+    def save(self, upload, on_ready=None):
+        state = current_app.extensions['images']
+        fd, upload_path = tempfile.mkstemp(dir=state.staging, suffix='.upload')
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: upload.stream.read(64 * 1024), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        name = digest.hexdigest()[:16]
+        filename = name + '.jpg'
+        with self._lock:
+            duplicate = name in state.pending or self.is_ready(filename)
+            if not duplicate:
+                state.pending.add(name)
+        app = current_app._get_current_object()
+        if duplicate:
+            os.remove(upload_path)
+        elif state.workers:
+            self._get_executor(state).submit(self._process, app, upload_path, name, on_ready)
+        else:
+            self._process(app, upload_path, name, on_ready)
+        return filename
+
+    def _write(self, folder, image, filename, fmt):
+        path = os.path.join(folder, filename)
+        tmp_path = path + '.tmp'
+        image.save(tmp_path, fmt)
+        os.replace(tmp_path, path)
+
+    def _process(self, app, upload_path, name, on_ready):
+        from PIL import Image
+        state = app.extensions['images']
+        try:
+            with app.app_context(), timed('pil'):
+                with Image.open(upload_path) as upload:
+                    image = upload.convert('RGB')
+                for size in sorted(SIZES, key=lambda size: size == DEFAULT_SIZE):
+                    resized = image.copy()
+                    resized.thumbnail((size, size))
+                    for fmt in self.formats:
+                        self._write(state.folder, resized, self.variant(name + '.jpg', size, fmt), fmt.upper())
+                    self._write(state.folder, resized, self.variant(name + '.jpg', size), 'JPEG')
+                if on_ready is not None:
+                    on_ready()
+        except Exception:
+            app.logger.exception('Failed to process image %s', name)
+        finally:
+            with self._lock:
+                state.pending.discard(name)
+            os.remove(upload_path)
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from uuid import uuid4
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+from playwin import db, stats
+from playwin.models import Child, Task, Reward, PointTransaction
+
+
+class LedgerError(Exception):
+    pass
+
+
+class DuplicateTransaction(LedgerError):
+    pass
+
+
+class InsufficientPoints(LedgerError):
+    pass
+
+
+class NegativeAmount(LedgerError):
+    pass
+
+
+def new_idempotency_key():
+    return uuid4().hex
+
+
+def item_key(key, kind, item_id):
+    """The stored key of one task or reward handled under the request's `key`; unique per child."""
+    return f'{key}:{kind}:{item_id}'
+
+
+def record_points(child_id, amount, description, idempotency_key=None, kind='adjustment'):
+    db.session.add(PointTransaction(child_id=child_id, amount=amount, description=description[:100], kind=kind,
+                                    idempotency_key=idempotency_key or new_idempotency_key()))
+    try:
+        db.session.flush()
+    except IntegrityError:
+        raise DuplicateTransaction()
+    query = Child.query.filter(Child.id == child_id, Child.points + amount >= 0)
+    if query.update({Child.points: Child.points + amount}, synchronize_session=False) != 1:
+        raise InsufficientPoints()
+
+
+def complete_task(task, idempotency_key=None):
+    complete_tasks([task], idempotency_key)
+
+
+def complete_tasks(tasks, idempotency_key=None):
+    key = idempotency_key or new_idempotency_key()
+    totals = defaultdict(int)
+    counts = defaultdict(int)
+    if any(task.points_awarded < 0 for task in tasks):
+        raise NegativeAmount()
+    for task in tasks:
+        totals[task.child_id] += task.points_awarded
+        counts[task.child_id] += 1
+    try:
+        db.session.bulk_insert_mappings(PointTransaction, [
+            dict(child_id=task.child_id, amount=task.points_awarded, description=f'Completed {task.name}'[:100],
+                 kind='task', idempotency_key=item_key(key, 'task', task.id))
+            for task in tasks
+        ])
+    except IntegrityError:
+        raise DuplicateTransaction()
+    result = db.session.execute(
+        Child.__table__.update().where(
+            (Child.id == bindparam('b_child_id')) & (Child.points + bindparam('b_amount') >= 0)
+        ).values(points=Child.points + bindparam('b_amount')),
+        [{'b_child_id': child_id, 'b_amount': amount} for child_id, amount in totals.items()]
+    )
+    if result.supports_sane_multi_rowcount() and result.rowcount != len(totals):
+        raise InsufficientPoints()
+    deleted = Task.query.filter(Task.id.in_([task.id for task in tasks])).delete(synchronize_session=False)
+    if deleted != len(tasks):
+        raise DuplicateTransaction()
+    stats.record({child_id: stats.Delta(amount, 0, counts[child_id], 0) for child_id, amount in totals.items()})
+
+
+def buy_reward(reward, idempotency_key=None):
+    if reward.points_required < 0:
+        raise NegativeAmount()
+    record_points(reward.child_id, -reward.points_required, f'Bought {reward.name}',
+                  item_key(idempotency_key or new_idempotency_key(), 'reward', reward.id), kind='reward')
+    if Reward.query.filter_by(id=reward.id).delete(synchronize_session=False) != 1:
+        raise DuplicateTransaction()
+    stats.record({reward.child_id: stats.Delta(0, reward.points_required, 0, 1)})
@@ -0,0 +1,200 @@
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+
+
+class MailSink:
+    """Stands in for the SMTP server when MAIL_BACKEND is 'sink', for development and tests.
+
+    Delivered messages are kept in `outbox` and logged. Setting `refuse_connections`, adding addresses to
+    `failing_recipients`, or setting `disconnect_after` to a number of messages per connection makes
+    connections or single sends fail the way an SMTP server would, so retries and backoff can be exercised.
+    """
+
+    def __init__(self):
+        self.outbox = []
+        self.connections = 0
+        self.refuse_connections = False
+        self.failing_recipients = set()
+        self.disconnect_after = None
+        self._sent_on_connection = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self.refuse_connections:
+            raise ConnectionRefusedError('the mail sink is refusing connections')
+        with self._lock:
+            self.connections += 1
+            self._sent_on_connection = 0
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send(self, message):
+        if self.disconnect_after is not None and self._sent_on_connection >= self.disconnect_after:
+            raise smtplib.SMTPServerDisconnected('the mail sink closed the connection')
+        refused = self.failing_recipients.intersection(message.recipients)
+        if refused:
+            raise smtplib.SMTPRecipientsRefused({recipient: (550, b'Mailbox unavailable') for recipient in refused})
+        with self._lock:
+            self.outbox.append(message)
+            self._sent_on_connection += 1
+        current_app.logger.info('Mail to %s: %s\n%s', ', '.join(message.recipients), message.subject, message.body)
+
+
+def _connection_lost(error):
+    # SMTPException derives from OSError too, but only a disconnect among them takes the connection down
+    return isinstance(error, smtplib.SMTPServerDisconnected) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException))
+
+
+class _Worker:
+    def __init__(self):
+        self.thread = None
+        self.wakeup = threading.Event()
+
+
+class MailDispatcher:
+    """Queues outgoing mail in the database and delivers it from a background thread per application.
+
+    Flask-Mail, and the email package behind it, is imported on the first delivery rather than at startup.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('MAIL_BACKEND', 'smtp')
+        app.config.setdefault('MAIL_ASYNC', True)
+        app.config.setdefault('MAIL_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_MAX_ATTEMPTS', 5)
+        app.config.setdefault('MAIL_RETRY_DELAY', 30)
+        app.config.setdefault('MAIL_CLAIM_TIMEOUT', 300)
+        app.config.setdefault('MAIL_POLL_INTERVAL', 60)
+        app.extensions['mail_dispatcher'] = _Worker()
+        if app.config['MAIL_BACKEND'] == 'sink':
+            app.extensions['mail_sink'] = MailSink()
+        self.db = db
+
+        @app.before_first_request
+        def start_mail_dispatcher():
+            # mail queued or backed off before a restart goes out without waiting for the next reset request
+            if app.config['MAIL_ASYNC']:
+                self._start(app).wakeup.set()
+
+        @app.cli.command('send-mail')
+        def send_mail_command():
+            """Deliver every queued email that is due."""
+            while self.dispatch_pending():
+                pass
+
+    def queue(self, subject, sender, recipients, body):
+        from playwin.models import OutgoingMail
+        self.db.session.add(OutgoingMail(subject=subject, sender=sender,
+                                         recipients=','.join(recipients), body=body))
+        self.db.session.commit()
+        if current_app.config['MAIL_ASYNC']:
+            worker = self._start(current_app._get_current_object())
+            worker.wakeup.set()
+        else:
+            self.dispatch_pending()
+
+    def _start(self, app):
+        worker = app.extensions['mail_dispatcher']
+        with self._lock:
+            if worker.thread is None or not worker.thread.is_alive():
+                worker.thread = threading.Thread(target=self._run, args=(app, worker), name='mail-dispatcher',
+                                                 daemon=True)
+                worker.thread.start()
+        return worker
+
+    def _run(self, app, worker):
+        with app.app_context():
+            while True:
+                worker.wakeup.wait(app.config['MAIL_POLL_INTERVAL'])
+                worker.wakeup.clear()
+                try:
+                    while self.dispatch_pending():
+                        pass
+                except Exception:
+                    app.logger.exception('Mail dispatch failed')
+                    self.db.session.rollback()
+                finally:
+                    self.db.session.remove()
+
+    @staticmethod
+    def _connect():
+        from flask_mail import Mail
+        app = current_app._get_current_object()
+        if app.config['MAIL_BACKEND'] == 'sink':
+            return app.extensions['mail_sink'].connect()
+        state = app.extensions.get('mail')
+        if state is None:
+            state = Mail().init_app(app)
+        return state.connect()
+
+    def _claim(self):
+        from playwin.models import OutgoingMail
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=current_app.config['MAIL_CLAIM_TIMEOUT'])
+        due = OutgoingMail.query.filter(
+            OutgoingMail.next_attempt <= now
+        ).order_by(
+            OutgoingMail.next_attempt
+        ).limit(current_app.config['MAIL_BATCH_SIZE']).all()
+        claimed = []
+        for outgoing in due:
+            updated = OutgoingMail.query.filter_by(
+                id=outgoing.id, next_attempt=outgoing.next_attempt
+            ).update({'next_attempt': lease}, synchronize_session=False)
+            if updated:
+                claimed.append(outgoing)
+        self.db.session.commit()
+        return claimed
+
+    def _failed(self, outgoing, error):
+        outgoing.attempts += 1
+        outgoing.last_error = str(error)[:255]
+        if outgoing.attempts >= current_app.config['MAIL_MAX_ATTEMPTS']:
+            outgoing.next_attempt = None
+        else:
+            delay = current_app.config['MAIL_RETRY_DELAY'] * 2 ** (outgoing.attempts - 1)
+            outgoing.next_attempt = datetime.utcnow() + timedelta(seconds=delay)
+
+    def dispatch_pending(self):
+        from flask_mail import Message
+        claimed = self._claim()
+        if not claimed:
+            return 0
+        pending = list(claimed)
+        lost = False
+        try:
+            with self._connect() as conn:
+                while pending and not lost:
+                    outgoing = pending.pop(0)
+                    try:
+                        conn.send(Message(outgoing.subject, sender=outgoing.sender,
+                                          recipients=outgoing.recipients.split(','), body=outgoing.body))
+                    except Exception as e:
+                        self._failed(outgoing, e)
+                        lost = _connection_lost(e)
+                    else:
+                        outgoing.sent_at = datetime.utcnow()
+                        outgoing.next_attempt = None
+        except Exception as e:
+            if not lost:
+                for outgoing in pending:
+                    self._failed(outgoing, e)
+        if lost:
+            # only the message in flight is charged for a dropped connection; the rest are due again at once
+            for outgoing in pending:
+                outgoing.next_attempt = datetime.utcnow()
+        self.db.session.commit()
+        return len(claimed)
@@ -0,0 +1,240 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from flask import Response, abort, current_app, g, has_app_context, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_labels(key, le=bound)} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_labels(key, le="+Inf")} {count}')
+                lines.append(f'{self.name}_sum{_labels(key)} {total}')
+                lines.append(f'{self.name}_count{_labels(key)} {count}')
+        return lines
+
+
+class Total:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(key)} {value:g}')
+        return lines
+
+
+def _labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+@contextmanager
+def timed(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if has_app_context() and 'metrics' in current_app.extensions:
+            current_app.extensions['metrics'].section_duration.observe(elapsed, section=section)
+        if has_request_context() and 'metrics_start' in g:
+            g.metrics_sections[section] += elapsed
+
+
+class TimedTemplate(Template):
+    def render(self, *args, **kwargs):
+        with timed('template'):
+            return super().render(*args, **kwargs)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.metrics_start
+    if has_request_context() and 'metrics_start' in g:
+        g.metrics_sql_count += 1
+        g.metrics_sql_time += elapsed
+
+
+class Profiler:
+    """Samples the stacks of in-flight requests from a single background thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        samples = Counter()
+        with self._lock:
+            self._samples[threading.get_ident()] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self):
+        with self._lock:
+            return self._samples.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._samples.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class _MetricsState:
+    def __init__(self, config):
+        self.request_duration = Histogram('playwin_request_duration_seconds', 'Time spent handling a request.')
+        self.requests = Total('playwin_requests_total', 'Requests handled, by endpoint and status.')
+        self.sql_queries = Total('playwin_sql_queries_total', 'SQL statements executed, by endpoint.')
+        self.sql_seconds = Total('playwin_sql_seconds_total', 'Time spent in SQL statements, by endpoint.')
+        self.section_duration = Histogram('playwin_section_duration_seconds',
+                                          'Time spent in templates, bcrypt and PIL.')
+        self.section_seconds = Total('playwin_section_seconds_total',
+                                     'Time spent in templates, bcrypt and PIL, by endpoint.')
+        self.registry = (self.request_duration, self.requests, self.sql_queries, self.sql_seconds,
+                         self.section_duration, self.section_seconds)
+        self.profiler = Profiler(config['PROFILER_INTERVAL']) if config['PROFILER_ENABLED'] else None
+
+
+class Metrics:
+    """Prometheus-style request, SQL and section timings, kept per app in `app.extensions['metrics']`.
+
+    A request is recorded when it is torn down rather than in `after_request`, so one that dies with an
+    unhandled exception still counts, as a 500.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_URL_PATH', '/metrics')
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.config.setdefault('PROFILER_INTERVAL', 0.005)
+        app.config.setdefault('PROFILER_THRESHOLD', 0.5)
+        app.config.setdefault('PROFILER_FOLDER', os.path.join(app.instance_path, 'profiles'))
+        app.extensions['metrics'] = _MetricsState(app.config)
+        app.jinja_env.template_class = TimedTemplate
+        if not event.contains(Engine, 'before_cursor_execute', _before_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_execute)
+        app.add_url_rule(app.config['METRICS_URL_PATH'], 'metrics', self.expose)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._record_request)
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_time = 0.0
+        g.metrics_sections = defaultdict(float)
+        profiler = current_app.extensions['metrics'].profiler
+        if profiler is not None:
+            profiler.start()
+
+    def _finish_request(self, response):
+        if 'metrics_start' not in g:
+            return response
+        g.metrics_status = response.status_code
+        if current_app.debug or current_app.testing:
+            elapsed = time.perf_counter() - g.metrics_start
+            timings = [('total', elapsed), ('sql', g.metrics_sql_time)] + list(g.metrics_sections.items())
+            response.headers['Server-Timing'] = ', '.join(f'{name};dur={seconds * 1000:.1f}'
+                                                          for name, seconds in timings)
+        return response
+
+    def _record_request(self, error=None):
+        if 'metrics_start' not in g:
+            return
+        state = current_app.extensions['metrics']
+        elapsed = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or 'none'
+        status = 500 if error is not None else g.get('metrics_status', 500)
+        state.request_duration.observe(elapsed, endpoint=endpoint)
+        state.requests.inc(endpoint=endpoint, method=request.method, status=status)
+        state.sql_queries.inc(g.metrics_sql_count, endpoint=endpoint)
+        state.sql_seconds.inc(g.metrics_sql_time, endpoint=endpoint)
+        for section, seconds in g.metrics_sections.items():
+            state.section_seconds.inc(seconds, endpoint=endpoint, section=section)
+        if state.profiler is not None:
+            samples = state.profiler.stop()
+            if samples and elapsed >= current_app.config['PROFILER_THRESHOLD']:
+                self._dump_profile(endpoint, elapsed, samples)
+
+    def _dump_profile(self, endpoint, elapsed, samples):
+        folder = current_app.config['PROFILER_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{elapsed * 1000:.0f}ms.folded')
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        current_app.logger.warning('%s took %.0f ms, profile written to %s', endpoint, elapsed * 1000, path)
+
+    def expose(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token is not None and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(403)
+        lines = []
+        for metric in current_app.extensions['metrics'].registry:
+            lines.extend(metric.expose())
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
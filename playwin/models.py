@@ -1,12 +1,18 @@
 from datetime import datetime
+from flask import current_app
 from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-from playwin import db, login_manager, app
+from playwin import db, login_manager, identity
 from flask_login import UserMixin
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user = identity.get(int(user_id))
+    if user is None:
+        user = User.query.get(int(user_id))
+        if user is not None:
+            user = identity.store(user)
+    return user
 
 
 class User(db.Model, UserMixin):
@@ -15,16 +21,17 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     image_file = db.Column(db.String(20), nullable=False, default='default.jpg')
     password = db.Column(db.String(60), nullable=False)
-    posts = db.relationship('Post', backref='author', lazy=True)
-    children = db.relationship('Child', backref='parent', lazy=True)
+    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    children = db.relationship('Child', backref='parent', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
 
     def get_reset_token(self, expires_sec=1800):
-        s = Serializer(app.config['SECRET_KEY'], expires_sec)
+        s = Serializer(current_app.config['SECRET_KEY'], expires_sec)
         return s.dumps({'user_id': self.id}).decode('utf-8')
 
     @staticmethod
     def verify_reset_token(token):
-        s = Serializer(app.config['SECRET_KEY'])
+        s = Serializer(current_app.config['SECRET_KEY'])
         try:
             user_id = s.loads(token)['user_id']
         except:
@@ -40,7 +47,11 @@ class Post(db.Model):
     title = db.Column(db.String(100), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    __table_args__ = (
+        db.Index('ix_post_date_posted_id', 'date_posted', 'id'),
+        db.Index('ix_post_user_id_date_posted', 'user_id', 'date_posted'),
+    )
 
     def __repr__(self):
         return f"Post('{self.title}', '{self.date_posted}')"
@@ -50,10 +61,14 @@ class Child(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     picture = db.Column(db.String(50), nullable=False, default='default.jpg')
-    parent_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     points = db.Column(db.Integer, default=0, nullable=False)
-    tasks = db.relationship('Task', backref='child', lazy=True)
-    rewards = db.relationship('Reward', backref='child', lazy=True)
+    tasks = db.relationship('Task', backref='child', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    rewards = db.relationship('Reward', backref='child', lazy=True, cascade='all, delete-orphan',
+                              passive_deletes=True)
+    __table_args__ = (
+        db.Index('ix_child_parent_id_name', 'parent_id', 'name'),
+    )
 
     def __repr__(self):
         return f"Child('{self.name}', '{self.parent_id}', '{self.points}')"
@@ -62,20 +77,96 @@ class Child(db.Model):
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    child_id = db.Column(db.Integer, db.ForeignKey('child.id'), nullable=False)
+    child_id = db.Column(db.Integer, db.ForeignKey('child.id', ondelete='CASCADE'), nullable=False, index=True)
     description = db.Column(db.String(255), nullable=True)
     points_awarded = db.Column(db.Integer, default=0, nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('task_template.id', ondelete='SET NULL'), nullable=True)
+    due_on = db.Column(db.Date, nullable=True)
+    __table_args__ = (
+        db.UniqueConstraint('template_id', 'due_on', name='uq_task_template_id_due_on'),
+    )
 
     def __repr__(self):
         return f"Task('{self.name}', '{self.child_id}', '{self.points_awarded}')"
 
 
+class TaskTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    child_id = db.Column(db.Integer, db.ForeignKey('child.id', ondelete='CASCADE'), nullable=False, index=True)
+    description = db.Column(db.String(255), nullable=True)
+    points_awarded = db.Column(db.Integer, default=0, nullable=False)
+    schedule = db.Column(db.String(50), nullable=False)
+    next_due = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f"TaskTemplate('{self.name}', '{self.child_id}', '{self.schedule}')"
+
+
 class Reward(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    child_id = db.Column(db.Integer, db.ForeignKey('child.id'), nullable=False)
+    child_id = db.Column(db.Integer, db.ForeignKey('child.id', ondelete='CASCADE'), nullable=False, index=True)
     description = db.Column(db.String(255), nullable=True)
     points_required = db.Column(db.Integer, default=0, nullable=False)
 
     def __repr__(self):
         return f"Reward('{self.name}', '{self.child_id}', '{self.points_required}')"
+
+
+class PointTransaction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('child.id', ondelete='CASCADE'), nullable=False, index=True)
+    amount = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.String(100), nullable=False)
+    # 'task', 'reward' or 'adjustment'; statistics are rebuilt from this, never from the description
+    kind = db.Column(db.String(10), nullable=False, default='adjustment', server_default='adjustment')
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # keys come from clients, so two families may pick the same one
+    __table_args__ = (
+        db.UniqueConstraint('child_id', 'idempotency_key', name='uq_point_transaction_child_id_idempotency_key'),
+    )
+
+    def __repr__(self):
+        return f"PointTransaction('{self.child_id}', '{self.amount}', '{self.description}')"
+
+
+class StatsRollup(db.Model):
+    scope = db.Column(db.String(6), primary_key=True)
+    owner_id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)
+    start = db.Column(db.Date, primary_key=True)
+    points_earned = db.Column(db.Integer, default=0, nullable=False)
+    points_spent = db.Column(db.Integer, default=0, nullable=False)
+    tasks_completed = db.Column(db.Integer, default=0, nullable=False)
+    rewards_bought = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"StatsRollup('{self.scope}', '{self.owner_id}', '{self.period}', '{self.start}')"
+
+
+class StatsStreak(db.Model):
+    scope = db.Column(db.String(6), primary_key=True)
+    owner_id = db.Column(db.Integer, primary_key=True)
+    current_streak = db.Column(db.Integer, default=0, nullable=False)
+    longest_streak = db.Column(db.Integer, default=0, nullable=False)
+    last_active = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f"StatsStreak('{self.scope}', '{self.owner_id}', '{self.current_streak}')"
+
+
+class OutgoingMail(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(120), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+
+    def __repr__(self):
+        return f"OutgoingMail('{self.subject}', '{self.recipients}', '{self.attempts}')"
@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(date_posted, post_id):
+    raw = f'{date_posted.isoformat()}|{post_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        date_posted, post_id = raw.split('|')
+        return datetime.fromisoformat(date_posted), int(post_id)
+    except ValueError:
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, date_column, id_column, per_page, after=None, before=None):
+    key = tuple_(date_column, id_column)
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+
+    if before is not None:
+        rows = query.filter(key > before).order_by(date_column.asc(), id_column.asc()).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after is not None:
+            query = query.filter(key < after)
+        rows = query.order_by(date_column.desc(), id_column.desc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after is not None
+
+    if not items:
+        return KeysetPage(items)
+    first, last = items[0], items[-1]
+    next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key)) if has_next else None
+    prev_cursor = encode_cursor(getattr(first, date_column.key), getattr(first, id_column.key)) if has_prev else None
+    return KeysetPage(items, next_cursor, prev_cursor)
@@ -0,0 +1,43 @@
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+class QueryCounter:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_BUDGET', None)
+        if not event.contains(Engine, 'before_cursor_execute', _count_query):
+            event.listen(Engine, 'before_cursor_execute', _count_query)
+
+        @app.before_request
+        def reset_query_count():
+            # g lives on the app context, which outlives a request when a test or CLI command has pushed one
+            g.query_count = 0
+
+        @app.after_request
+        def check_query_budget(response):
+            count = g.get('query_count', 0)
+            budget = app.config['QUERY_BUDGET']
+            if isinstance(budget, dict):
+                budget = budget.get(request.endpoint)
+            if budget is not None and count > budget:
+                message = f'{request.endpoint} ran {count} queries (budget {budget})'
+                if app.testing:
+                    raise QueryBudgetExceeded(message)
+                app.logger.warning(message)
+            if app.debug or app.testing:
+                response.headers['X-Query-Count'] = str(count)
+            return response
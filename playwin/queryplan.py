@@ -0,0 +1,159 @@
+import os
+import re
+import tempfile
+import click
+from flask_migrate import upgrade
+from sqlalchemy import event
+
+FULL_SCAN = re.compile(r'SCAN (?:TABLE )?(?P<table>\w+)(?P<rest>.*)')
+CHECKED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+ROUTES = [
+    ('GET', '/home'),
+    ('GET', '/home?after={cursor}'),
+    ('GET', '/home?before={cursor}'),
+    ('GET', '/post/{post_id}'),
+    ('GET', '/user/{username}'),
+    ('GET', '/user/{username}?after={cursor}'),
+    ('GET', '/search?q=content&page=2'),
+    ('GET', '/children'),
+    ('GET', '/child/{child_id}'),
+    ('GET', '/child/{child_id}?task_after={task_id}&reward_after={reward_id}'),
+    ('GET', '/child/{child_id}/recurring'),
+    ('GET', '/child/{child_id}/stats'),
+    ('GET', '/stats'),
+    ('GET', '/account'),
+    ('GET', '/account/export.ndjson'),
+    ('GET', '/account/export/posts.csv'),
+    ('GET', '/account/export/tasks.csv'),
+    ('GET', '/account/export/recurring_tasks.csv'),
+    ('GET', '/account/export/rewards.csv'),
+    ('GET', '/account/export/points.csv'),
+    ('GET', '/api/v1/posts'),
+    ('GET', '/api/v1/posts?after={cursor}'),
+    ('GET', '/api/v1/posts?user_id={user_id}'),
+    ('GET', '/api/v1/posts/search?q=title'),
+    ('GET', '/api/v1/posts/{post_id}'),
+    ('GET', '/api/v1/children'),
+    ('GET', '/api/v1/children/{child_id}'),
+    ('GET', '/api/v1/children/{child_id}/tasks?after={task_id}'),
+    ('GET', '/api/v1/children/{child_id}/rewards'),
+    ('GET', '/api/v1/children/{child_id}/stats'),
+    ('GET', '/api/v1/stats'),
+    ('GET', '/api/v1/account/export'),
+    ('GET', '/api/v1/account/export/points.csv'),
+    ('POST', '/children/tasks/new', {'name': 'task', 'points_awarded': '1', 'children': ['{child_id}']}),
+    ('POST', '/children/rewards/new', {'name': 'reward', 'points_required': '0', 'children': ['{child_id}']}),
+    ('POST', '/child/{child_id}/recurring', {'name': 'chore', 'points_awarded': '1', 'schedule': 'daily'}),
+    ('POST', '/child/{child_id}/recurring/{template_id}/delete'),
+    ('POST', '/child/{child_id}/task/{task_id}/complete'),
+    ('POST', '/child/{child_id}/reward/{reward_id}/buy'),
+    ('POST', '/api/v1/children/{child_id}/tasks/{api_task_id}/complete'),
+    ('POST', '/api/v1/children/{child_id}/rewards/{api_reward_id}/buy'),
+    ('POST', '/children/tasks/complete', {'task_ids': ['{batch_task_id}']}),
+    ('POST', '/children/tasks/delete', {'task_ids': ['{removed_task_id}']}),
+    ('POST', '/children/rewards/delete', {'reward_ids': ['{removed_reward_id}']}),
+    ('POST', '/child/{child_id}/delete', {'password': 'password'}),
+    ('POST', '/account/delete', {'password': 'password'}),
+]
+
+
+def full_scans(connection, tables, statement, parameters):
+    rows = connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    scans = []
+    for row in rows:
+        match = FULL_SCAN.match(row[-1])
+        if match and match.group('table') in tables and not match.group('rest').startswith((' USING', ' VIRTUAL')):
+            scans.append(row[-1])
+    return scans
+
+
+def _fill(data, values):
+    if isinstance(data, str):
+        return data.format(**values)
+    if isinstance(data, list):
+        return [_fill(item, values) for item in data]
+    return {key: _fill(value, values) for key, value in data.items()}
+
+
+class QueryPlanChecker:
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+
+        @app.cli.command('check-query-plans')
+        def check_query_plans_command():
+            """Fail if any route's queries need a full table scan."""
+            failures = self.check()
+            for endpoint, statement, scans in failures:
+                click.echo(f'{endpoint}: {", ".join(scans)}' + (f'\n    {statement}' if statement else ''), err=True)
+            if failures:
+                raise click.ClickException(f'{len(failures)} routes failed or scan a whole table')
+            click.echo('All route queries use an index.')
+
+    def _seed(self):
+        from playwin import hasher
+        from datetime import date
+        from playwin.models import User, Post, Child, Task, TaskTemplate, Reward
+        from playwin.pagination import encode_cursor
+        user = User(username='planner', email='planner@demo.com', password=hasher.generate_password_hash('password'))
+        self.db.session.add(user)
+        self.db.session.commit()
+        post = Post(title='title', content='content', user_id=user.id)
+        child = Child(name='child', parent_id=user.id)
+        self.db.session.add_all([post, child])
+        self.db.session.commit()
+        # the routes that complete, buy or delete an item each get one of their own
+        tasks = {name: Task(name='task', description='', points_awarded=1, child_id=child.id)
+                 for name in ('task_id', 'api_task_id', 'batch_task_id', 'removed_task_id')}
+        rewards = {name: Reward(name='reward', description='', points_required=0, child_id=child.id)
+                   for name in ('reward_id', 'api_reward_id', 'removed_reward_id')}
+        template = TaskTemplate(name='chore', points_awarded=1, child_id=child.id, schedule='* * *',
+                                next_due=date.today())
+        self.db.session.add_all([*tasks.values(), *rewards.values(), template])
+        self.db.session.commit()
+        return dict(cursor=encode_cursor(post.date_posted, post.id), post_id=post.id, username=user.username,
+                    user_id=user.id, child_id=child.id, template_id=template.id,
+                    **{name: item.id for name, item in {**tasks, **rewards}.items()})
+
+    def check(self):
+        from playwin import create_app
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'plan.db'),
+                          'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET': None, 'RECURRING_SCHEDULER': False})
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+                statements.append((endpoint, statement, parameters[0] if executemany else parameters))
+
+        with app.app_context():
+            upgrade(directory=app.extensions['migrate'].directory)
+            values = self._seed()
+            client = app.test_client()
+            endpoint = 'POST /login'
+            event.listen(self.db.engine, 'before_cursor_execute', capture)
+            event.listen(self.db.get_read_engine(), 'before_cursor_execute', capture)
+            client.post('/login', data={'email': 'planner@demo.com', 'password': 'password'})
+            failures = []
+            for method, url, *data in ROUTES:
+                endpoint = f'{method} {url}'
+                response = client.open(url.format(**values), method=method,
+                                       data=_fill(data[0], values) if data else None)
+                response.get_data()
+                # a route that errors out never reaches the queries it is listed here to check
+                if response.status_code >= 400:
+                    failures.append((endpoint, None, [f'HTTP {response.status_code}']))
+            event.remove(self.db.engine, 'before_cursor_execute', capture)
+            event.remove(self.db.get_read_engine(), 'before_cursor_execute', capture)
+
+            with self.db.engine.connect() as connection:
+                tables = {name for name, in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+                for endpoint, statement, parameters in statements:
+                    scans = full_scans(connection, tables, statement, parameters)
+                    if scans:
+                        failures.append((endpoint, statement, scans))
+            return failures
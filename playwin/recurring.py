@@ -0,0 +1,183 @@
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+import click
+from flask import current_app
+from sqlalchemy import and_, case, exists, literal, select
+from sqlalchemy.exc import IntegrityError
+
+ALIASES = {'daily': '* * *'}
+FIELDS = (('day of month', 1, 31), ('month', 1, 12), ('day of week', 0, 7))
+# '29 2 *' only comes round every four years, or eight across a skipped century leap day
+MAX_LOOKAHEAD = 366 * 8
+
+
+class ScheduleError(ValueError):
+    pass
+
+
+def _values(text, name, low, high):
+    values = set()
+    for part in text.split(','):
+        body, _, step = part.partition('/')
+        try:
+            if body == '*':
+                start, end = low, high
+            elif '-' in body:
+                start, end = (int(bound) for bound in body.split('-', 1))
+            else:
+                start = int(body)
+                end = high if step else start
+            step = int(step) if step else 1
+        except ValueError:
+            raise ScheduleError(f'"{part}" is not a valid {name}')
+        if not low <= start <= end <= high or step < 1:
+            raise ScheduleError(f'"{part}" is out of range for {name} ({low}-{high})')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Schedule:
+    """A cron-style "day-of-month month day-of-week" rule (0 or 7 is Sunday).
+
+    As in cron, when both the day of month and the day of week are restricted a day matching either
+    one is due.
+    """
+
+    def __init__(self, text):
+        fields = text.split()
+        if len(fields) != 3:
+            raise ScheduleError('Use "daily", "weekly" or three fields: day-of-month month day-of-week')
+        days, months, weekdays = (_values(field, *spec) for field, spec in zip(fields, FIELDS))
+        self.text = text
+        self.days = days
+        self.months = months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[0] == '*'
+        self.any_weekday = fields[2] == '*'
+
+    def matches(self, day):
+        if day.month not in self.months:
+            return False
+        by_day = day.day in self.days
+        by_weekday = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return by_day and by_weekday
+        return by_day or by_weekday
+
+    def first_on_or_after(self, day):
+        for offset in range(MAX_LOOKAHEAD):
+            candidate = day + timedelta(days=offset)
+            if self.matches(candidate):
+                return candidate
+        raise ScheduleError(f'"{self.text}" never comes round')
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    return Schedule(text)
+
+
+@lru_cache(maxsize=4096)
+def next_after(text, day):
+    return parse(text).first_on_or_after(day + timedelta(days=1))
+
+
+def normalize(text, today):
+    """Store aliases as their cron fields; "weekly" repeats on today's weekday."""
+    text = ' '.join(text.lower().split())
+    if text == 'weekly':
+        text = f'* * {today.isoweekday() % 7}'
+    text = ALIASES.get(text, text)
+    parse(text).first_on_or_after(today)
+    return text
+
+
+class RecurringTasks:
+    """Turns task templates into Task rows on their due dates.
+
+    Due templates are handled in id-ordered batches of RECURRING_BATCH_SIZE; each batch is one
+    INSERT ... SELECT of the new tasks plus one UPDATE that moves next_due to the following occurrence,
+    committed together. A crash or a second scheduler therefore never creates an instance twice: a
+    batch either commits whole or is picked up again by the next run, and the unique
+    (template_id, due_on) constraint backs this up. A template whose previous instance is still
+    open is skipped rather than stacked, and missed occurrences are not replayed.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('RECURRING_SCHEDULER', True)
+        app.config.setdefault('RECURRING_BATCH_SIZE', 5000)
+        app.config.setdefault('RECURRING_INTERVAL', 3600)
+        app.extensions['recurring'] = None
+        self.db = db
+
+        @app.before_first_request
+        def start_scheduler():
+            if app.config['RECURRING_SCHEDULER']:
+                self._start(app)
+
+        @app.cli.command('materialize-tasks')
+        @click.option('--date', 'day', type=click.DateTime(['%Y-%m-%d']), help='Run as of this day (default: today).')
+        def materialize_tasks_command(day):
+            """Create the tasks that recurring templates have due."""
+            started = time.perf_counter()
+            created = self.materialize(day.date() if day else None)
+            click.echo(f'Created {created} tasks in {time.perf_counter() - started:.1f}s.')
+
+    def _start(self, app):
+        with self._lock:
+            thread = app.extensions['recurring']
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._run, args=(app,), name='recurring-tasks', daemon=True)
+                app.extensions['recurring'] = thread
+                thread.start()
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                try:
+                    self.materialize()
+                except IntegrityError:
+                    # another scheduler created this batch first; the next run picks up whatever is left
+                    self.db.session.rollback()
+                    app.logger.info('Recurring tasks were already created by another scheduler, skipping')
+                except Exception:
+                    app.logger.exception('Recurring task materialization failed')
+                    self.db.session.rollback()
+                finally:
+                    self.db.session.remove()
+                time.sleep(app.config['RECURRING_INTERVAL'])
+
+    def materialize(self, today=None, *criteria):
+        from playwin.models import Task, TaskTemplate
+        today = today or date.today()
+        session = self.db.session
+        due = and_(TaskTemplate.next_due <= today, *criteria)
+        open_instance = exists().where(Task.template_id == TaskTemplate.id)
+        created = 0
+        after = 0
+        while True:
+            batch = session.query(TaskTemplate.id, TaskTemplate.schedule).filter(
+                TaskTemplate.id > after, due
+            ).order_by(TaskTemplate.id).limit(current_app.config['RECURRING_BATCH_SIZE']).all()
+            if not batch:
+                return created
+            in_batch = and_(TaskTemplate.id > after, TaskTemplate.id <= batch[-1].id, due)
+            created += session.execute(Task.__table__.insert().from_select(
+                ['name', 'description', 'points_awarded', 'child_id', 'template_id', 'due_on'],
+                select([TaskTemplate.name, TaskTemplate.description, TaskTemplate.points_awarded,
+                        TaskTemplate.child_id, TaskTemplate.id, TaskTemplate.next_due]).where(
+                    and_(in_batch, ~open_instance))
+            )).rowcount
+            next_due = {schedule: literal(next_after(schedule, today)) for schedule in {row.schedule for row in batch}}
+            session.query(TaskTemplate).filter(in_batch).update(
+                {TaskTemplate.next_due: case(next_due, value=TaskTemplate.schedule, else_=TaskTemplate.next_due)},
+                synchronize_session=False)
+            session.commit()
+            after = batch[-1].id
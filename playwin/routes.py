@@ -1,205 +1,338 @@
-import os
-import secrets
-from PIL import Image
-from flask import render_template, url_for, flash, redirect, request, abort
-from playwin import app, db, bcrypt, mail
+from collections import defaultdict
+from datetime import date
+from flask import Blueprint, render_template, url_for, flash, redirect, request, abort, jsonify
+from playwin import (db, hasher, mail_dispatcher, page_cache, images, identity, events, post_search, recurring,
+                     account_export)
 from playwin.forms import (RegistrationForm, LoginForm, UpdateAccountForm, PostForm, RequestResetForm,
-                           ResetPasswordForm, ChildForm, TaskForm, RewardForm)
-from playwin.models import User, Post, Child, Task, Reward
+                           ResetPasswordForm, ChildForm, TaskForm, RecurringTaskForm, RewardForm, BatchTaskForm,
+                           BatchRewardForm, ConfirmDeleteForm)
+from playwin.models import User, Post, Child, Task, TaskTemplate, Reward
+from playwin.recurring import normalize, parse
+from playwin.pagination import keyset_paginate
+from playwin.hashing import HasherBusy
+from playwin.events import TooManyListeners
+from playwin import ledger, stats
+from playwin.dashboard import load_child_items
 from flask_login import login_user, current_user, logout_user, login_required
-from flask_mail import Message
 
+main = Blueprint('main', __name__)
 
-@app.route("/")
-@app.route("/home")
+
+@main.route("/")
+@main.route("/home")
+@page_cache.cached('feed')
 def home():
-    page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=5)
+    posts = keyset_paginate(Post.query.options(db.joinedload(Post.author)), Post.date_posted, Post.id, per_page=5,
+                            after=request.args.get('after'), before=request.args.get('before'))
     return render_template('home.html', posts=posts)
 
 
-@app.route("/about")
+@main.app_errorhandler(HasherBusy)
+@main.app_errorhandler(TooManyListeners)
+def hasher_busy(error):
+    return 'The server is busy, please try again in a moment.', 503, {'Retry-After': '1'}
+
+
+@main.app_template_global()
+def idempotency_key():
+    return ledger.new_idempotency_key()
+
+
+def _idempotency_key():
+    return (request.headers.get('Idempotency-Key') or request.form.get('idempotency_key', ''))[:40] or None
+
+
+@main.route("/about")
 def about():
     return render_template('about.html', title='About')
 
 
-@app.route("/register", methods=['GET', 'POST'])
+@main.route("/register", methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = hasher.generate_password_hash(form.password.data)
         user = User(username=form.username.data, email=form.email.data, password=hashed_password)
         db.session.add(user)
         db.session.commit()
         flash('Your account has been created! You are now able to log in!', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', title='Register', form=form)
 
 
-@app.route("/login", methods=['GET', 'POST'])
+@main.route("/login", methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        if user and hasher.check_password_hash(user.password, form.password.data):
+            if hasher.needs_rehash(user.password):
+                user.password = hasher.generate_password_hash(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember.data)
+            identity.store(user)
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('home'))
+            return redirect(next_page) if next_page else redirect(url_for('main.home'))
         else:
             flash('Login Unsuccessful. Please check email and password', 'danger')
     return render_template('login.html', title='Login', form=form)
 
 
-@app.route("/logout")
+@main.route("/logout")
 def logout():
     logout_user()
-    return redirect(url_for('home'))
-
-
-def save_picture(form_picture):
-    random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(form_picture.filename)
-    picture_fn = random_hex + f_ext
-    picture_path = os.path.join(app.root_path, 'static/profile_pics', picture_fn)
+    identity.clear()
+    return redirect(url_for('main.home'))
 
-    output_size = (125, 125)
-    i = Image.open(form_picture)
-    i.thumbnail(output_size)
-    i.save(picture_path)
 
-    return picture_fn
-
-
-@app.route("/account", methods=['GET', 'POST'])
+@main.route("/account", methods=['GET', 'POST'])
 @login_required
 def account():
     form = UpdateAccountForm()
     if form.validate_on_submit():
+        user = User.query.get(current_user.id)
         if form.picture.data:
-            picture_file = save_picture(form.picture.data)
-            current_user.image_file = picture_file
-        current_user.username = form.username.data
-        current_user.email = form.email.data
+            user.image_file = images.save(form.picture.data, on_ready=page_cache.invalidate_all)
+        user.username = form.username.data
+        user.email = form.email.data
         db.session.commit()
+        identity.invalidate(user)
+        identity.store(user)
+        page_cache.invalidate_all()
         flash('Your account has been updated!', 'success')
-        return redirect(url_for('account'))
+        return redirect(url_for('main.account'))
     elif request.method == 'GET':
         form.username.data = current_user.username
         form.email.data = current_user.email
-    image_file = url_for('static', filename='profile_pics/' + current_user.image_file)
-    return render_template('account.html', title='Account', image_file=image_file, form=form)
+    image_file = images.picture_url(current_user.image_file)
+    return render_template('account.html', title='Account', image_file=image_file, form=form,
+                           delete_form=ConfirmDeleteForm())
+
+
+def password_confirmed(password):
+    """Whether `password` is the current user's; required before anything that cascades through an account."""
+    hashed = db.session.query(User.password).filter_by(id=current_user.id).scalar()
+    return hashed is not None and hasher.check_password_hash(hashed, password or '')
+
+
+def remove_user(user_id):
+    """Delete an account in one statement; ON DELETE CASCADE removes its posts and children, and theirs in turn."""
+    stats.forget_family(user_id)
+    return User.query.filter_by(id=user_id).delete(synchronize_session=False)
+
+
+@main.route("/account/delete", methods=['POST'])
+@login_required
+def delete_account():
+    form = ConfirmDeleteForm()
+    if not (form.validate_on_submit() and password_confirmed(form.password.data)):
+        flash('Your account was not deleted: the password did not match.', 'danger')
+        return redirect(url_for('main.account'))
+    remove_user(current_user.id)
+    db.session.commit()
+    identity.invalidate(current_user)
+    logout_user()
+    identity.clear()
+    page_cache.invalidate_all()
+    flash('Your account has been deleted.', 'info')
+    return redirect(url_for('main.home'))
+
+
+@main.route("/account/export.ndjson")
+@login_required
+def export_account():
+    return account_export.stream_ndjson(current_user.id, f'playwin-{current_user.username}.ndjson')
+
+
+@main.route("/account/export/<string:section>.csv")
+@login_required
+def export_account_section(section):
+    response = account_export.stream_csv(current_user.id, section, f'playwin-{current_user.username}-{section}.csv')
+    if response is None:
+        abort(404)
+    return response
 
 
-@app.route("/post/new", methods=['GET', 'POST'])
+@main.route("/post/new", methods=['GET', 'POST'])
 @login_required
 def new_post():
     form = PostForm()
     if form.validate_on_submit():
-        post = Post(title=form.title.data, content=form.content.data, author=current_user)
+        post = Post(title=form.title.data, content=form.content.data, user_id=current_user.id)
         db.session.add(post)
         db.session.commit()
+        page_cache.invalidate('feed')
         flash('Your post has been created!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     return render_template('create_post.html', title='New Post', form=form, legend='New Post')
 
 
-@app.route("/post/<int:post_id>")
+@main.route("/post/<int:post_id>")
+@page_cache.cached('post:{post_id}')
 def post(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(db.joinedload(Post.author)).get_or_404(post_id)
     return render_template('post.html', title=post.title, post=post)
 
 
-@app.route("/post/<int:post_id>/update", methods=['GET', 'POST'])
+@main.route("/post/<int:post_id>/update", methods=['GET', 'POST'])
 @login_required
 def update_post(post_id):
     post = Post.query.get_or_404(post_id)
-    if post.author != current_user:
+    if post.user_id != current_user.id:
         abort(403)
     form = PostForm()
     if form.validate_on_submit():
         post.title = form.title.data
         post.content = form.content.data
         db.session.commit()
+        page_cache.invalidate('feed')
+        page_cache.invalidate(f'post:{post.id}')
         flash('Your post has been updated!', 'success')
-        return redirect(url_for('post', post_id=post.id))
+        return redirect(url_for('main.post', post_id=post.id))
     elif request.method == 'GET':
         form.title.data = post.title
         form.content.data = post.content
     return render_template('create_post.html', title='Update Post', form=form, legend='Update Post')
 
 
-@app.route("/post/<int:post_id>/delete", methods=['POST'])
+@main.route("/post/<int:post_id>/delete", methods=['POST'])
 @login_required
 def delete_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    if post.author != current_user:
+    user_id = db.session.query(Post.user_id).filter_by(id=post_id).scalar()
+    if user_id is None:
+        abort(404)
+    if user_id != current_user.id:
         abort(403)
-    db.session.delete(post)
+    Post.query.filter_by(id=post_id).delete(synchronize_session=False)
     db.session.commit()
+    page_cache.invalidate('feed')
+    page_cache.invalidate(f'post:{post_id}')
     flash('Your post has been deleted!', 'success')
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
+
 
+@main.route("/search")
+def search():
+    q = request.args.get('q', '').strip()
+    results = post_search.search(q, request.args.get('page', 1, type=int))
+    return render_template('search.html', title='Search', q=q, results=results)
 
-@app.route("/user/<string:username>")
+
+@main.route("/user/<string:username>")
 def user_posts(username):
-    page = request.args.get('page', 1, type=int)
     user = User.query.filter_by(username=username).first_or_404()
-    posts = Post.query.filter_by(
-        author=user
-    ).order_by(
-        Post.date_posted.desc()
-    ).paginate(page=page, per_page=5)
+    posts = keyset_paginate(Post.query.filter_by(user_id=user.id), Post.date_posted, Post.id, per_page=5,
+                            after=request.args.get('after'), before=request.args.get('before'))
     return render_template('user_posts.html', posts=posts, user=user)
 
 
 def send_reset_email(user):
     token = user.get_reset_token()
-    msg = Message('Password Reset Request',
-                  sender='noreply@demo.com',
-                  recipients=[user.email])
-    msg.body = f'''To reset your password, visit the following link:
-{url_for('reset_token', token=token, _external=True)}
+    body = f'''To reset your password, visit the following link:
+{url_for('main.reset_token', token=token, _external=True)}
 If you did not make this request then simply ignore this email and no changes will be made.
 '''
-    mail.send(msg)
+    mail_dispatcher.queue('Password Reset Request', sender='noreply@demo.com',
+                          recipients=[user.email], body=body)
 
 
-@app.route("/reset_password", methods=['GET', 'POST'])
+@main.route("/reset_password", methods=['GET', 'POST'])
 def reset_request():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     form = RequestResetForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         send_reset_email(user)
         flash('An email has been sent with instructions to reset your password.', 'info')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('reset_request.html', title='Reset Password', form=form)
 
 
-@app.route("/reset_password/<token>", methods=['GET', 'POST'])
+@main.route("/reset_password/<token>", methods=['GET', 'POST'])
 def reset_token(token):
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     user = User.verify_reset_token(token)
     if user is None:
         flash('That is an invalid or expired token', 'warning')
-        return redirect(url_for('reset_request'))
+        return redirect(url_for('main.reset_request'))
     form = ResetPasswordForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_password = hasher.generate_password_hash(form.password.data)
         user.password = hashed_password
         db.session.commit()
+        identity.invalidate(user)
         flash('Your password has been updated! You are now able to log in!', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('reset_token.html', title='Reset Password', form=form)
 
 
-@app.route("/child/new", methods=['GET', 'POST'])
+def authorize_child(child_id):
+    parent_id = db.session.query(Child.parent_id).filter_by(id=child_id).scalar()
+    if parent_id is None:
+        abort(404)
+    if parent_id != current_user.id:
+        abort(403)
+
+
+def remove_children(child_ids):
+    """Delete children in one statement; ON DELETE CASCADE removes their tasks, rewards, recurring tasks and
+    point history inside the database rather than loading them."""
+    stats.forget_children(child_ids)
+    return Child.query.filter(Child.id.in_(child_ids)).delete(synchronize_session=False)
+
+
+def publish_points(child_ids):
+    for child_id, points in db.session.query(Child.id, Child.points).filter(Child.id.in_(child_ids)):
+        events.publish(f'child:{child_id}', 'points', points=points)
+
+
+def publish_added(kind, child_id, item=None):
+    events.publish(f'child:{child_id}', f'{kind}-added', **(item or {}))
+
+
+def publish_removed(kind, items):
+    removed = defaultdict(list)
+    for item_id, child_id in items:
+        removed[child_id].append(item_id)
+    for child_id, ids in removed.items():
+        events.publish(f'child:{child_id}', f'{kind}-removed', ids=ids)
+
+
+@main.route("/child/<int:child_id>/events")
+@login_required
+def child_events(child_id):
+    if not events.enabled:
+        abort(404)
+    child = db.session.query(Child.parent_id, Child.points).filter_by(id=child_id).first_or_404()
+    if child.parent_id != current_user.id:
+        abort(403)
+    return events.stream(f'child:{child_id}', ('points', {'points': child.points}))
+
+
+@main.route("/child/<int:child_id>/stats")
+@login_required
+def child_stats(child_id):
+    child = db.session.query(Child.parent_id, Child.name).filter_by(id=child_id).first_or_404()
+    if child.parent_id != current_user.id:
+        abort(403)
+    return render_template('stats.html', title=f'{child.name} stats', heading=child.name,
+                           stats=stats.summary('child', child_id))
+
+
+@main.route("/stats")
+@login_required
+def family_stats():
+    return render_template('stats.html', title='Family stats', heading='Family', stats=stats.summary(
+        'family', current_user.id), leaderboard=stats.leaderboard(current_user.id))
+
+
+@main.route("/child/new", methods=['GET', 'POST'])
 @login_required
 def add_child():
     form = ChildForm()
@@ -208,150 +341,336 @@ def add_child():
         db.session.add(child)
         db.session.commit()
         flash('Your child has been added!', 'success')
-        return redirect(url_for('children'))
+        return redirect(url_for('main.children'))
     return render_template('add_child.html', title='Add Child', form=form, legend='Add Child')
 
 
-@app.route("/child/<int:child_id>")
+@main.route("/child/<int:child_id>")
 def child(child_id):
-    page = request.args.get('page', 1, type=int)
     child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
+    if not current_user.is_authenticated or child.parent_id != current_user.id:
         abort(403)
-    tasks = Task.query.filter_by(child_id=child.id).paginate(page=page, per_page=100)
-    rewards = Reward.query.filter_by(child_id=child.id).paginate(page=page, per_page=100)
-    return render_template('child.html', title=child.name, child=child, tasks=tasks, rewards=rewards)
+    tasks, rewards = load_child_items(child.id, task_after=request.args.get('task_after', type=int),
+                                      reward_after=request.args.get('reward_after', type=int))
+    return render_template('child.html', title=child.name, child=child, tasks=tasks, rewards=rewards,
+                           live_updates=events.enabled, delete_form=ConfirmDeleteForm())
 
 
-@app.route("/child/<int:child_id>/update", methods=['GET', 'POST'])
+@main.route("/child/<int:child_id>/update", methods=['GET', 'POST'])
 @login_required
 def update_child(child_id):
     child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
+    if child.parent_id != current_user.id:
         abort(403)
     form = ChildForm()
     if form.validate_on_submit():
         if form.picture.data:
-            picture_file = save_picture(form.picture.data)
-            child.picture = picture_file
+            child.picture = images.save(form.picture.data)
         child.name = form.name.data
         db.session.commit()
         flash("Your child's information has been updated!", 'success')
-        return redirect(url_for('child', child_id=child.id))
+        return redirect(url_for('main.child', child_id=child.id))
     elif request.method == 'GET':
         form.name.data = child.name
-    picture = url_for('static', filename='profile_pics/' + child.picture)
+    picture = images.picture_url(child.picture)
     return render_template('update_child.html', title='Update',
                            picture=picture, form=form, legend='Update', child=child)
 
 
-@app.route("/child/<int:child_id>/delete", methods=['POST'])
+@main.route("/child/<int:child_id>/delete", methods=['POST'])
 @login_required
 def remove_child(child_id):
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
-    db.session.delete(child)
+    authorize_child(child_id)
+    form = ConfirmDeleteForm()
+    if not (form.validate_on_submit() and password_confirmed(form.password.data)):
+        flash('Your child was not removed: the password did not match.', 'danger')
+        return redirect(url_for('main.child', child_id=child_id))
+    remove_children([child_id])
     db.session.commit()
     flash('Your child has been removed!', 'success')
-    return redirect(url_for('children'))
+    return redirect(url_for('main.children'))
 
 
-@app.route("/children")
+@main.route("/children")
 def children():
     page = request.args.get('page', 1, type=int)
     if current_user.is_authenticated:
-        user = User.query.filter_by(username=current_user.username).first_or_404()
-        children = Child.query.filter_by(parent=user).order_by(Child.name.asc()).paginate(page=page, per_page=10)
+        children = Child.query.filter_by(parent_id=current_user.id).order_by(Child.name.asc()).paginate(
+            page=page, per_page=10)
     else:
         children = 1
-        user = 1
-    return render_template('children.html', title='About', children=children, user=user)
+    return render_template('children.html', title='About', children=children)
 
 
-@app.route("/child/<int:child_id>/task/new", methods=['GET', 'POST'])
+@main.route("/child/<int:child_id>/task/new", methods=['GET', 'POST'])
 @login_required
 def add_task(child_id):
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
+    authorize_child(child_id)
     form = TaskForm()
     if form.validate_on_submit():
         task = Task(name=form.name.data, description=form.description.data,
-                    points_awarded=form.points_awarded.data, child_id=child.id)
+                    points_awarded=form.points_awarded.data, child_id=child_id)
         db.session.add(task)
         db.session.commit()
+        publish_added('task', child_id, dict(id=task.id, name=task.name, description=task.description,
+                                             points_awarded=task.points_awarded))
         flash('Your task has been added!', 'success')
-        return redirect(url_for('child', child_id=child.id))
+        return redirect(url_for('main.child', child_id=child_id))
     return render_template('add_task.html', title='Add Task', form=form, legend='Add Task')
 
 
-@app.route("/child/<int:child_id>/task/<int:task_id>/delete", methods=['POST'])
+@main.route("/child/<int:child_id>/task/<int:task_id>/delete", methods=['POST'])
 @login_required
 def remove_task(child_id, task_id):
-    task = Task.query.get_or_404(task_id)
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
-    db.session.delete(task)
+    authorize_child(child_id)
+    if not Task.query.filter_by(id=task_id, child_id=child_id).delete(synchronize_session=False):
+        abort(404)
     db.session.commit()
+    publish_removed('task', [(task_id, child_id)])
     flash('The task has been removed!', 'success')
-    return redirect(url_for('children'))
+    return redirect(url_for('main.children'))
 
 
-@app.route("/child/<int:child_id>/task/<int:task_id>/complete", methods=['POST'])
+@main.route("/child/<int:child_id>/task/<int:task_id>/complete", methods=['POST'])
 @login_required
 def check_task(child_id, task_id):
-    task = Task.query.get_or_404(task_id)
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
-    child.points = child.points + task.points_awarded
-    db.session.delete(task)
-    db.session.commit()
+    authorize_child(child_id)
+    task = Task.query.filter_by(id=task_id, child_id=child_id).first_or_404()
+    try:
+        ledger.complete_task(task, _idempotency_key())
+        db.session.commit()
+    except ledger.DuplicateTransaction:
+        db.session.rollback()
+        flash('The task has already been completed!', 'info')
+        return redirect(url_for('main.children'))
+    except (ledger.NegativeAmount, ledger.InsufficientPoints):
+        db.session.rollback()
+        flash('Completing this task would leave a negative balance!', 'danger')
+        return redirect(url_for('main.child', child_id=child_id))
+    publish_points([child_id])
+    publish_removed('task', [(task_id, child_id)])
     flash('The task has been completed!', 'success')
-    return redirect(url_for('children'))
+    return redirect(url_for('main.children'))
 
 
-@app.route("/child/<int:child_id>/reward/new", methods=['GET', 'POST'])
+@main.route("/child/<int:child_id>/recurring", methods=['GET', 'POST'])
+@login_required
+def recurring_tasks(child_id):
+    authorize_child(child_id)
+    form = RecurringTaskForm()
+    if form.validate_on_submit():
+        today = date.today()
+        schedule = normalize(form.schedule.data, today)
+        template = TaskTemplate(name=form.name.data, description=form.description.data,
+                                points_awarded=form.points_awarded.data or 0, child_id=child_id,
+                                schedule=schedule, next_due=parse(schedule).first_on_or_after(today))
+        db.session.add(template)
+        db.session.commit()
+        if recurring.materialize(today, TaskTemplate.id == template.id):
+            publish_added('task', child_id)
+        flash('Your recurring task has been added!', 'success')
+        return redirect(url_for('main.recurring_tasks', child_id=child_id))
+    templates = TaskTemplate.query.filter_by(child_id=child_id).order_by(TaskTemplate.id).all()
+    return render_template('recurring_tasks.html', title='Recurring Tasks', form=form, legend='Add Recurring Task',
+                           templates=templates, child_id=child_id)
+
+
+@main.route("/child/<int:child_id>/recurring/<int:template_id>/delete", methods=['POST'])
+@login_required
+def remove_recurring_task(child_id, template_id):
+    authorize_child(child_id)
+    if not TaskTemplate.query.filter_by(id=template_id, child_id=child_id).delete(synchronize_session=False):
+        abort(404)
+    db.session.commit()
+    flash('The recurring task has been removed!', 'success')
+    return redirect(url_for('main.recurring_tasks', child_id=child_id))
+
+
+@main.route("/child/<int:child_id>/reward/new", methods=['GET', 'POST'])
 @login_required
 def add_reward(child_id):
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
+    authorize_child(child_id)
     form = RewardForm()
     if form.validate_on_submit():
         reward = Reward(name=form.name.data, description=form.description.data,
-                        points_required=form.points_required.data, child_id=child.id)
+                        points_required=form.points_required.data, child_id=child_id)
         db.session.add(reward)
         db.session.commit()
+        publish_added('reward', child_id, dict(id=reward.id, name=reward.name, description=reward.description,
+                                               points_required=reward.points_required))
         flash('Your reward has been added!', 'success')
-        return redirect(url_for('child', child_id=child.id))
+        return redirect(url_for('main.child', child_id=child_id))
     return render_template('add_reward.html', title='Add Reward', form=form, legend='Add Reward')
 
 
-@app.route("/child/<int:child_id>/reward/<int:reward_id>/delete", methods=['POST'])
+@main.route("/child/<int:child_id>/reward/<int:reward_id>/delete", methods=['POST'])
 @login_required
 def remove_reward(child_id, reward_id):
-    reward = Reward.query.get_or_404(reward_id)
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
-        abort(403)
-    db.session.delete(reward)
+    authorize_child(child_id)
+    if not Reward.query.filter_by(id=reward_id, child_id=child_id).delete(synchronize_session=False):
+        abort(404)
     db.session.commit()
+    publish_removed('reward', [(reward_id, child_id)])
     flash('The reward has been removed!', 'success')
-    return redirect(url_for('children'))
+    return redirect(url_for('main.children'))
 
 
-@app.route("/child/<int:child_id>/reward/<int:reward_id>/buy", methods=['POST'])
+@main.route("/child/<int:child_id>/reward/<int:reward_id>/buy", methods=['POST'])
 @login_required
 def buy_reward(child_id, reward_id):
-    reward = Reward.query.get_or_404(reward_id)
-    child = Child.query.get_or_404(child_id)
-    if child.parent != current_user:
+    authorize_child(child_id)
+    reward = Reward.query.filter_by(id=reward_id, child_id=child_id).first_or_404()
+    try:
+        ledger.buy_reward(reward, _idempotency_key())
+        db.session.commit()
+    except ledger.DuplicateTransaction:
+        db.session.rollback()
+        flash('The reward has already been purchased!', 'info')
+        return redirect(url_for('main.children'))
+    except ledger.InsufficientPoints:
+        db.session.rollback()
+        flash('Not enough points to buy this reward!', 'danger')
+        return redirect(url_for('main.child', child_id=child_id))
+    except ledger.NegativeAmount:
+        db.session.rollback()
+        flash('This reward has a negative price and cannot be bought!', 'danger')
+        return redirect(url_for('main.child', child_id=child_id))
+    publish_points([child_id])
+    publish_removed('reward', [(reward_id, child_id)])
+    flash('The reward has been purchased!', 'success')
+    return redirect(url_for('main.children'))
+
+
+def _owned_children():
+    return db.session.query(Child.id).filter_by(parent_id=current_user.id)
+
+
+def _batch_items(form, points_field):
+    if request.is_json:
+        items = (request.get_json(silent=True) or {}).get('items')
+        if not isinstance(items, list):
+            abort(400)
+        try:
+            rows = [dict(child_id=int(item['child_id']), name=str(item['name'])[:50],
+                         description=str(item.get('description') or '')[:255],
+                         **{points_field: int(item.get(points_field) or 0)}) for item in items]
+        except (KeyError, TypeError, ValueError):
+            abort(400)
+        if not all(row['name'] and row[points_field] >= 0 for row in rows):
+            abort(400)
+        return rows
+    form.children.choices = [(child_id, name) for child_id, name in db.session.query(
+        Child.id, Child.name).filter_by(parent_id=current_user.id).order_by(Child.name.asc())]
+    if not form.validate_on_submit():
+        return None
+    return [dict(child_id=child_id, name=form.name.data, description=form.description.data,
+                 **{points_field: getattr(form, points_field).data or 0}) for child_id in form.children.data]
+
+
+def _insert_batch(model, rows):
+    owned = {child_id for child_id, in _owned_children()}
+    if any(row['child_id'] not in owned for row in rows):
         abort(403)
-    child.points = child.points - reward.points_required
-    db.session.delete(reward)
+    db.session.bulk_insert_mappings(model, rows)
     db.session.commit()
-    flash('The reward has been purchased!', 'success')
-    return redirect(url_for('children'))
\ No newline at end of file
+    for child_id in {row['child_id'] for row in rows}:
+        publish_added(model.__tablename__, child_id)
+
+
+def _selected_ids(field):
+    if request.is_json:
+        ids = (request.get_json(silent=True) or {}).get(field)
+        if not isinstance(ids, list):
+            abort(400)
+    else:
+        ids = request.form.getlist(field)
+    try:
+        return sorted({int(item_id) for item_id in ids})
+    except (TypeError, ValueError):
+        abort(400)
+
+
+def _batch_done(message, status=200, category='success', **counts):
+    if request.is_json:
+        return jsonify(**counts), status
+    flash(message, category)
+    return redirect(url_for('main.children'))
+
+
+@main.route("/children/tasks/new", methods=['GET', 'POST'])
+@login_required
+def add_tasks():
+    form = BatchTaskForm()
+    rows = _batch_items(form, 'points_awarded')
+    if rows is not None:
+        _insert_batch(Task, rows)
+        return _batch_done(f'{len(rows)} tasks have been added!', 201, created=len(rows))
+    return render_template('add_task.html', title='Add Tasks', form=form, legend='Add Tasks')
+
+
+@main.route("/children/rewards/new", methods=['GET', 'POST'])
+@login_required
+def add_rewards():
+    form = BatchRewardForm()
+    rows = _batch_items(form, 'points_required')
+    if rows is not None:
+        _insert_batch(Reward, rows)
+        return _batch_done(f'{len(rows)} rewards have been added!', 201, created=len(rows))
+    return render_template('add_reward.html', title='Add Rewards', form=form, legend='Add Rewards')
+
+
+@main.route("/children/tasks/complete", methods=['POST'])
+@login_required
+def complete_tasks():
+    task_ids = _selected_ids('task_ids')
+    if not task_ids:
+        return _batch_done('No tasks were selected.', 400, 'info', completed=0)
+    tasks = db.session.query(Task.id, Task.child_id, Task.name, Task.points_awarded).filter(
+        Task.id.in_(task_ids), Task.child_id.in_(_owned_children())
+    ).all()
+    if len(tasks) != len(task_ids):
+        abort(404)
+    try:
+        ledger.complete_tasks(tasks, _idempotency_key())
+        db.session.commit()
+    except ledger.DuplicateTransaction:
+        db.session.rollback()
+        return _batch_done('These tasks have already been completed!', 409, 'info', completed=0)
+    except (ledger.NegativeAmount, ledger.InsufficientPoints):
+        db.session.rollback()
+        return _batch_done('Completing these tasks would leave a negative balance!', 400, 'danger', completed=0)
+    publish_points({task.child_id for task in tasks})
+    publish_removed('task', [(task.id, task.child_id) for task in tasks])
+    return _batch_done(f'{len(tasks)} tasks have been completed!', completed=len(tasks))
+
+
+def _remove_selected(model, ids):
+    items = db.session.query(model.id, model.child_id).filter(
+        model.id.in_(ids), model.child_id.in_(_owned_children())
+    ).all()
+    if not items:
+        return 0
+    removed = model.query.filter(model.id.in_([item_id for item_id, _ in items])).delete(synchronize_session=False)
+    db.session.commit()
+    publish_removed(model.__tablename__, items)
+    return removed
+
+
+@main.route("/children/tasks/delete", methods=['POST'])
+@login_required
+def remove_tasks():
+    task_ids = _selected_ids('task_ids')
+    if not task_ids:
+        return _batch_done('No tasks were selected.', 400, 'info', removed=0)
+    removed = _remove_selected(Task, task_ids)
+    return _batch_done(f'{removed} tasks have been removed!', removed=removed)
+
+
+@main.route("/children/rewards/delete", methods=['POST'])
+@login_required
+def remove_rewards():
+    reward_ids = _selected_ids('reward_ids')
+    if not reward_ids:
+        return _batch_done('No rewards were selected.', 400, 'info', removed=0)
+    removed = _remove_selected(Reward, reward_ids)
+    return _batch_done(f'{removed} rewards have been removed!', removed=removed)
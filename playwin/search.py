@@ -0,0 +1,125 @@
+import re
+import time
+import click
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import and_, column, func, literal_column, or_, table
+
+MARK_START, MARK_END = '\x02', '\x03'
+MAX_TERMS = 8
+TERM = re.compile(r'\w+')
+
+post_fts = table('post_fts', column('rowid'), column('title'), column('content'))
+_fts = literal_column('post_fts')
+# the expression of the ix_post_search GIN index on PostgreSQL, spelled with constants so the planner can match it
+post_document = literal_column("(setweight(to_tsvector('english', post.title), 'A') || "
+                               "setweight(to_tsvector('english', post.content), 'B'))")
+
+
+def search_terms(query):
+    return TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query that ANDs its words, so user input never reaches the FTS5 parser."""
+    return ' '.join(f'"{term}"' for term in search_terms(query))
+
+
+def _contains(column, term):
+    return column.ilike('%' + term.replace('_', '\\_') + '%', escape='\\')
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class SearchPage:
+    def __init__(self, items, page, per_page):
+        self.items = items[:per_page]
+        self.page = page
+        self.has_next = len(items) > per_page
+        self.has_prev = page > 1
+
+
+class PostSearch:
+    """Ranked full-text search over post titles and contents.
+
+    On SQLite `post_fts` is an FTS5 index with `post` as its external content; triggers on `post` keep it in
+    step with every insert, update and delete, so only rows that change are reindexed. On PostgreSQL the
+    migration builds a GIN index over the weighted tsvector below and ranking uses ts_rank. Other databases
+    fall back to an unranked LIKE scan, newest first.
+
+    Ranking scores every match before it can sort. SEARCH_RANK_WINDOW, when set, ranks only the newest that
+    many matches, so a word found in most posts costs the same as a rare one; older matches are not returned.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SEARCH_PER_PAGE', 10)
+        app.config.setdefault('SEARCH_MAX_PAGES', 50)
+        app.config.setdefault('SEARCH_RANK_WINDOW', None)
+        self.db = db
+        app.add_template_filter(highlight)
+
+        @app.cli.command('rebuild-search-index')
+        def rebuild_search_index_command():
+            """Reindex every post, e.g. after a bulk import that bypassed the triggers."""
+            started = time.perf_counter()
+            count = self.rebuild()
+            click.echo(f'Indexed {count} posts in {time.perf_counter() - started:.1f}s.')
+
+    def rebuild(self):
+        with self.db.engine.begin() as connection:
+            # PostgreSQL maintains its GIN index itself and the LIKE fallback has none
+            if connection.dialect.name == 'sqlite':
+                connection.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+                connection.execute("INSERT INTO post_fts(post_fts) VALUES ('optimize')")
+            return connection.execute('SELECT count(*) FROM post').scalar()
+
+    def search(self, query, page=1):
+        per_page = current_app.config['SEARCH_PER_PAGE']
+        page = max(1, min(page, current_app.config['SEARCH_MAX_PAGES']))
+        terms = search_terms(query)
+        if not terms:
+            return SearchPage([], page, per_page)
+        rows = self.query(self.db.engine.dialect.name, terms).limit(per_page + 1).offset((page - 1) * per_page).all()
+        return SearchPage(rows, page, per_page)
+
+    def query(self, dialect, terms):
+        """The ranked matches for `terms` as (id, title, date_posted, author, image_file, snippet) rows."""
+        from playwin.models import User, Post
+        window = current_app.config['SEARCH_RANK_WINDOW']
+        if dialect == 'sqlite':
+            condition = _fts.op('MATCH')(match_expression(' '.join(terms)))
+            snippet = func.snippet(_fts, 1, MARK_START, MARK_END, '…', 24)
+            matches = self.db.session.query(post_fts.c.rowid).filter(condition)
+            rank = func.bm25(_fts, 10.0, 1.0)
+            rowid = post_fts.c.rowid
+        elif dialect == 'postgresql':
+            tsquery = func.plainto_tsquery('english', ' '.join(terms))
+            condition = post_document.op('@@')(tsquery)
+            snippet = func.ts_headline('english', Post.content, tsquery,
+                                       f'StartSel="{MARK_START}", StopSel="{MARK_END}", MaxWords=24, MinWords=8')
+            matches = self.db.session.query(Post.id).filter(condition)
+            rank = func.ts_rank(post_document, tsquery).desc()
+            rowid = Post.id
+        else:
+            condition = and_(*(or_(_contains(Post.title, term), _contains(Post.content, term)) for term in terms))
+            snippet = func.substr(Post.content, 1, 160)
+            matches = self.db.session.query(Post.id).filter(condition)
+            rank = Post.id.desc()
+            rowid = Post.id
+        rows = self.db.session.query(
+            Post.id, Post.title, Post.date_posted, User.username.label('author'), User.image_file,
+            snippet.label('snippet'),
+        )
+        if dialect == 'sqlite':
+            rows = rows.select_from(post_fts).join(Post, Post.id == post_fts.c.rowid)
+        rows = rows.join(User, User.id == Post.user_id).filter(condition)
+        if window:
+            oldest_ranked = matches.order_by(rowid.desc()).offset(window - 1).limit(1).as_scalar()
+            rows = rows.filter(rowid >= func.coalesce(oldest_ranked, 0))
+        return rows.order_by(rank)
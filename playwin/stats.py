@@ -0,0 +1,214 @@
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, case, func, or_, select, text
+from playwin import db
+from playwin.models import Child, PointTransaction, StatsRollup, StatsStreak
+
+Delta = namedtuple('Delta', 'earned spent tasks rewards')
+
+# `start` of the all-time rows, so every rollup shares one key shape
+TOTAL = date(1970, 1, 1)
+STATS_FIELDS = ('points_earned', 'points_spent', 'tasks_completed', 'rewards_bought')
+
+# columns are qualified with the table name: PostgreSQL finds a bare name ambiguous next to `excluded`
+ROLLUP_UPSERT = text("""
+    INSERT INTO stats_rollup (scope, owner_id, period, start, points_earned, points_spent, tasks_completed,
+                              rewards_bought)
+    VALUES (:scope, :owner_id, :period, :start, :earned, :spent, :tasks, :rewards)
+    ON CONFLICT (scope, owner_id, period, start) DO UPDATE SET
+        points_earned = stats_rollup.points_earned + excluded.points_earned,
+        points_spent = stats_rollup.points_spent + excluded.points_spent,
+        tasks_completed = stats_rollup.tasks_completed + excluded.tasks_completed,
+        rewards_bought = stats_rollup.rewards_bought + excluded.rewards_bought
+""").bindparams(bindparam('start', type_=db.Date))
+
+_STREAK = ('CASE WHEN stats_streak.last_active = :day THEN stats_streak.current_streak '
+           'WHEN stats_streak.last_active = :yesterday THEN stats_streak.current_streak + 1 ELSE 1 END')
+# a CASE instead of max()/GREATEST(), which are spelled differently on SQLite and PostgreSQL
+STREAK_UPSERT = text(f"""
+    INSERT INTO stats_streak (scope, owner_id, current_streak, longest_streak, last_active)
+    VALUES (:scope, :owner_id, 1, 1, :day)
+    ON CONFLICT (scope, owner_id) DO UPDATE SET
+        current_streak = {_STREAK},
+        longest_streak = CASE WHEN stats_streak.longest_streak > {_STREAK} THEN stats_streak.longest_streak
+                              ELSE {_STREAK} END,
+        last_active = :day
+""").bindparams(bindparam('day', type_=db.Date), bindparam('yesterday', type_=db.Date))
+
+# takes the rollups of children about to be deleted out of their families' rows
+FAMILY_SUBTRACT = text("""
+    UPDATE stats_rollup SET
+        points_earned = stats_rollup.points_earned - removed.points_earned,
+        points_spent = stats_rollup.points_spent - removed.points_spent,
+        tasks_completed = stats_rollup.tasks_completed - removed.tasks_completed,
+        rewards_bought = stats_rollup.rewards_bought - removed.rewards_bought
+    FROM (SELECT child.parent_id, rollup.period, rollup.start, sum(rollup.points_earned) AS points_earned,
+                 sum(rollup.points_spent) AS points_spent, sum(rollup.tasks_completed) AS tasks_completed,
+                 sum(rollup.rewards_bought) AS rewards_bought
+          FROM stats_rollup AS rollup JOIN child ON child.id = rollup.owner_id
+          WHERE rollup.scope = 'child' AND rollup.owner_id IN :child_ids
+          GROUP BY child.parent_id, rollup.period, rollup.start) AS removed
+    WHERE stats_rollup.scope = 'family' AND stats_rollup.owner_id = removed.parent_id
+      AND stats_rollup.period = removed.period AND stats_rollup.start = removed.start
+""").bindparams(bindparam('child_ids', expanding=True))
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _periods(day):
+    return (('day', day), ('week', week_start(day)), ('total', TOTAL))
+
+
+def record(changes, day=None):
+    """Add `{child_id: Delta}` to the day, week and all-time rollups of each child and its family.
+
+    Runs inside the caller's transaction, so the rollups commit or roll back with the ledger entries
+    they summarize. A day with a completed task extends the owner's streak.
+    """
+    day = day or today()
+    parents = dict(db.session.query(Child.id, Child.parent_id).filter(Child.id.in_(list(changes))))
+    owners = defaultdict(lambda: Delta(0, 0, 0, 0))
+    for child_id, delta in changes.items():
+        for key in (('child', child_id), ('family', parents[child_id])):
+            owners[key] = Delta(*(total + value for total, value in zip(owners[key], delta)))
+    db.session.execute(ROLLUP_UPSERT, [
+        dict(scope=scope, owner_id=owner_id, period=period, start=start, **delta._asdict())
+        for (scope, owner_id), delta in owners.items() for period, start in _periods(day)
+    ])
+    active = [dict(scope=scope, owner_id=owner_id, day=day, yesterday=day - timedelta(days=1))
+              for (scope, owner_id), delta in owners.items() if delta.tasks]
+    if active:
+        db.session.execute(STREAK_UPSERT, active)
+
+
+def forget_children(child_ids):
+    """Drop the rollups and streaks of children that are being deleted and take them out of their families' totals.
+
+    Call before deleting the children. The family streak is left alone: the days it counted still happened.
+    """
+    child_ids = list(child_ids)
+    if not child_ids:
+        return
+    db.session.execute(FAMILY_SUBTRACT, {'child_ids': child_ids})
+    for model in (StatsRollup, StatsStreak):
+        model.query.filter(model.scope == 'child', model.owner_id.in_(child_ids)).delete(synchronize_session=False)
+
+
+def forget_family(parent_id):
+    """Drop every rollup and streak of a family and its children, before the parent's account is deleted."""
+    children = select([Child.id]).where(Child.parent_id == parent_id)
+    for model in (StatsRollup, StatsStreak):
+        model.query.filter(or_(and_(model.scope == 'family', model.owner_id == parent_id),
+                               and_(model.scope == 'child', model.owner_id.in_(children)))
+                           ).delete(synchronize_session=False)
+
+
+def _row(row):
+    return {field: getattr(row, field) if row else 0 for field in STATS_FIELDS}
+
+
+def summary(scope, owner_id, days=14, weeks=8):
+    """Totals, a day and a week series and the streak of one child or family, read from rollup rows only."""
+    day = today()
+    first_day, first_week = day - timedelta(days=days - 1), week_start(day) - timedelta(weeks=weeks - 1)
+    rows = StatsRollup.query.filter(
+        StatsRollup.scope == scope, StatsRollup.owner_id == owner_id,
+        or_(and_(StatsRollup.period == 'day', StatsRollup.start >= first_day),
+            and_(StatsRollup.period == 'week', StatsRollup.start >= first_week),
+            StatsRollup.period == 'total')
+    ).all()
+    by_key = {(row.period, row.start): row for row in rows}
+    streak = StatsStreak.query.get((scope, owner_id))
+    current = streak.current_streak if streak and streak.last_active >= day - timedelta(days=1) else 0
+    return dict(
+        total=_row(by_key.get(('total', TOTAL))),
+        days=[dict(start=start.isoformat(), **_row(by_key.get(('day', start))))
+              for start in (first_day + timedelta(days=offset) for offset in range(days))],
+        weeks=[dict(start=start.isoformat(), **_row(by_key.get(('week', start))))
+               for start in (first_week + timedelta(weeks=offset) for offset in range(weeks))],
+        streak=dict(current=current, longest=streak.longest_streak if streak else 0),
+    )
+
+
+def leaderboard(parent_id):
+    """A family's children ranked by the points they earned this week."""
+    day = today()
+    week = db.aliased(StatsRollup)
+    streak = db.aliased(StatsStreak)
+    points = func.coalesce(week.points_earned, 0)
+    rows = db.session.query(
+        Child.id, Child.name, points.label('points_earned'),
+        func.coalesce(week.tasks_completed, 0).label('tasks_completed'), streak.current_streak, streak.last_active,
+    ).outerjoin(week, and_(week.scope == 'child', week.owner_id == Child.id, week.period == 'week',
+                           week.start == week_start(day))
+    ).outerjoin(streak, and_(streak.scope == 'child', streak.owner_id == Child.id)
+    ).filter(Child.parent_id == parent_id).order_by(points.desc(), Child.name).all()
+    return [dict(id=row.id, name=row.name, points_earned=row.points_earned, tasks_completed=row.tasks_completed,
+                 streak=row.current_streak if row.last_active and row.last_active >= day - timedelta(days=1) else 0)
+            for row in rows]
+
+
+def _streaks(days):
+    longest = current = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous == day - timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+def rebuild():
+    """Recompute every rollup and streak from the point ledger."""
+    completed = PointTransaction.kind == 'task'
+    bought = PointTransaction.kind == 'reward'
+    rows = db.session.query(
+        PointTransaction.child_id, Child.parent_id,
+        func.date(PointTransaction.date_created, type_=db.Date).label('day'),
+        func.sum(case([(completed, PointTransaction.amount)], else_=0)),
+        func.sum(case([(bought, -PointTransaction.amount)], else_=0)),
+        func.sum(case([(completed, 1)], else_=0)),
+        func.sum(case([(bought, 1)], else_=0)),
+    ).join(Child, Child.id == PointTransaction.child_id).filter(completed | bought).group_by(
+        PointTransaction.child_id, Child.parent_id, 'day').all()
+    rollups = defaultdict(lambda: [0, 0, 0, 0])
+    active = defaultdict(set)
+    for child_id, parent_id, day, *delta in rows:
+        for owner in (('child', child_id), ('family', parent_id)):
+            for period, start in _periods(day):
+                totals = rollups[owner + (period, start)]
+                for index, value in enumerate(delta):
+                    totals[index] += value
+            if delta[2]:
+                active[owner].add(day)
+    StatsStreak.query.delete()
+    StatsRollup.query.delete()
+    db.session.bulk_insert_mappings(StatsRollup, [
+        dict(scope=scope, owner_id=owner_id, period=period, start=start, **dict(zip(STATS_FIELDS, totals)))
+        for (scope, owner_id, period, start), totals in rollups.items()
+    ])
+    db.session.bulk_insert_mappings(StatsStreak, [
+        dict(scope=scope, owner_id=owner_id, **dict(zip(('current_streak', 'longest_streak', 'last_active'),
+                                                        _streaks(sorted(days)))))
+        for (scope, owner_id), days in active.items()
+    ])
+    db.session.commit()
+    return len(rows)
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute the statistics rollups from the point ledger, e.g. after upgrading."""
+    started = time.perf_counter()
+    days = rebuild()
+    click.echo(f'Rebuilt statistics from {days} child-days in {time.perf_counter() - started:.1f}s.')
@@ -0,0 +1,80 @@
+import shutil
+import pytest
+from flask_migrate import upgrade
+from playwin import create_app, db, hasher
+from playwin.models import User, Child
+
+CONFIG = {
+    'TESTING': True,
+    'WTF_CSRF_ENABLED': False,
+    'BCRYPT_LOG_ROUNDS': 4,
+    'HASHER_WORKERS': 0,
+    'MAIL_ASYNC': False,
+    'MAIL_BACKEND': 'sink',
+    'IMAGE_WORKERS': 0,
+    'RECURRING_SCHEDULER': False,
+}
+
+
+def _close_engines(app):
+    db.get_engine(app).dispose()
+    db.get_read_engine(app).dispose()
+
+
+@pytest.fixture(scope='session')
+def migrated_db(tmp_path_factory):
+    """A database upgraded to the latest migration once per run; every test starts from a copy."""
+    path = tmp_path_factory.mktemp('schema') / 'schema.db'
+    app = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}'))
+    with app.app_context():
+        upgrade(directory=app.extensions['migrate'].directory)
+    _close_engines(app)
+    return path
+
+
+@pytest.fixture
+def app(migrated_db, tmp_path):
+    path = tmp_path / 'test.db'
+    shutil.copy(migrated_db, path)
+    pictures = tmp_path / 'profile_pics'
+    pictures.mkdir()
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    app = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', IMAGE_FOLDER=str(pictures),
+                          IMAGE_UPLOAD_FOLDER=str(uploads), ASSETS_CACHE_FOLDER=str(tmp_path / 'assets')))
+    yield app
+    _close_engines(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(username='parent', password='password'):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@demo.com',
+                        password=hasher.generate_password_hash(password))
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+def login(client, username='parent', password='password'):
+    response = client.post('/login', data={'email': f'{username}@demo.com', 'password': password})
+    assert response.status_code == 302
+    return response
+
+
+@pytest.fixture
+def make_child(app):
+    def make_child(parent_id, name='child', points=0):
+        with app.app_context():
+            child = Child(name=name, parent_id=parent_id, points=points)
+            db.session.add(child)
+            db.session.commit()
+            return child.id
+    return make_child
@@ -0,0 +1,52 @@
+import gzip
+import os
+import pytest
+
+
+@pytest.fixture
+def main_css(app):
+    with app.test_request_context():
+        url = app.extensions['assets'].url('main.css')
+        path, digest = app.extensions['assets'].fingerprint('main.css')
+    with open(path, 'rb') as f:
+        return url, digest, f.read()
+
+
+def test_fingerprinted_asset_is_cached_forever(client, main_css):
+    url, digest, content = main_css
+    assert url == f'/assets/main.{digest}.css'
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200 and response.data == content
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert 'Content-Encoding' not in response.headers
+    assert client.get(url, headers={'If-None-Match': f'"{digest}"'}).status_code == 304
+
+
+def test_stale_or_missing_fingerprint_is_not_found(client, main_css):
+    url, digest, _ = main_css
+    assert client.get(url.replace(digest, '0' * 12)).status_code == 404
+    assert client.get('/assets/main.css').status_code == 404
+    assert client.get('/assets/missing.0123456789ab.css').status_code == 404
+
+
+def test_precompressed_variant_follows_accept_encoding(app, client, main_css):
+    url, digest, content = main_css
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == content
+
+    with open(os.path.join(app.config['ASSETS_CACHE_FOLDER'], digest + '.br'), 'wb') as f:
+        f.write(b'brotli bytes')
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br' and response.data == b'brotli bytes'
+    assert client.get(url, headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
+
+
+def test_x_accel_redirect_hands_static_files_to_the_proxy(app, client, main_css):
+    url, digest, _ = main_css
+    app.config['ASSETS_X_ACCEL_PREFIX'] = '/protected-static/'
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['X-Accel-Redirect'] == '/protected-static/main.css'
+    assert response.data == b'' and response.mimetype == 'text/css'
+    assert response.headers['Cache-Control'].endswith('immutable')
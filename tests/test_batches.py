@@ -0,0 +1,59 @@
+import warnings
+import pytest
+from playwin import db
+from playwin.models import Task, Reward
+from tests.conftest import login
+
+
+@pytest.fixture
+def family(app, client, make_user, make_child):
+    child_id = make_child(make_user())
+    login(client)
+    return child_id
+
+
+def add(app, *items):
+    with app.app_context():
+        db.session.add_all(items)
+        db.session.commit()
+        return [item.id for item in items]
+
+
+def count(app, model):
+    with app.app_context():
+        return model.query.count()
+
+
+@pytest.mark.parametrize('endpoint, field, counter', [
+    ('/children/tasks/complete', 'task_ids', 'completed'),
+    ('/children/tasks/delete', 'task_ids', 'removed'),
+    ('/children/rewards/delete', 'reward_ids', 'removed'),
+])
+def test_empty_selection_is_refused_without_a_query(app, client, family, endpoint, field, counter):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        response = client.post(endpoint, json={field: []})
+    assert response.status_code == 400
+    assert response.get_json() == {counter: 0}
+    assert int(response.headers['X-Query-Count']) <= 1
+
+
+def test_empty_form_selection_flashes_and_redirects(app, client, family):
+    response = client.post('/children/rewards/delete', follow_redirects=True)
+    assert b'No rewards were selected.' in response.data
+
+
+def test_remove_selected_tasks_and_rewards(app, client, family):
+    task_ids = add(app, Task(name='dishes', points_awarded=5, child_id=family),
+                   Task(name='laundry', points_awarded=3, child_id=family))
+    reward_ids = add(app, Reward(name='movie', points_required=3, child_id=family))
+    assert client.post('/children/tasks/delete', json={'task_ids': task_ids}).get_json() == {'removed': 2}
+    assert client.post('/children/rewards/delete', json={'reward_ids': reward_ids}).get_json() == {'removed': 1}
+    assert count(app, Task) == count(app, Reward) == 0
+
+
+def test_other_families_items_are_not_removed(app, client, family, make_user, make_child):
+    other = make_child(make_user('stranger'), name='other')
+    task_ids = add(app, Task(name='dishes', points_awarded=5, child_id=other))
+    assert client.post('/children/tasks/delete', json={'task_ids': task_ids}).get_json() == {'removed': 0}
+    assert count(app, Task) == 1
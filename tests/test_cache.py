@@ -0,0 +1,43 @@
+from playwin.cache import LRUCache
+from playwin.models import Post
+from tests.conftest import login
+
+
+def test_entries_expire_after_timeout(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('playwin.cache.time.monotonic', lambda: now[0])
+    cache = LRUCache(maxsize=4, timeout=30)
+    cache.set('feed', 'page')
+    now[0] += 29
+    assert cache.get('feed') == 'page'
+    now[0] += 2
+    assert cache.get('feed') is None
+
+
+def test_versions_are_bounded_and_never_go_back():
+    cache = LRUCache(maxsize=3)
+    cache.bump_version('user:1')
+    stale = cache.get_version('user:1')
+    cache.bump_version('user:1')
+    current = cache.get_version('user:1')
+    for user_id in range(2, 10):
+        cache.bump_version(f'user:{user_id}')
+    assert len(cache._versions) == 3
+    assert cache.get_version('user:1') not in (stale, 0)
+    assert cache.get_version('user:1') >= current
+
+
+def test_anonymous_feed_is_cached_until_a_new_post(app, client, make_user):
+    make_user()
+    first = client.get('/home')
+    assert int(first.headers['X-Query-Count']) > 0
+    cached = client.get('/home')
+    assert cached.headers['X-Query-Count'] == '0'
+    assert client.get('/home', headers={'If-None-Match': cached.headers['ETag']}).status_code == 304
+
+    author = app.test_client()
+    login(author)
+    author.post('/post/new', data={'title': 'fresh post', 'content': 'content'})
+    assert 'fresh post' in client.get('/home').get_data(as_text=True)
+    with app.app_context():
+        assert Post.query.count() == 1
@@ -0,0 +1,43 @@
+import html
+import re
+from playwin import db
+from playwin.models import Task, Reward
+from tests.conftest import login
+
+
+def shown(page, prefix):
+    return sorted(int(number) for number in re.findall(rf' {prefix}-(\d+), DESCRIPTION', page))
+
+
+def more_link(page, label):
+    return html.unescape(re.search(rf'href="([^"]+)">{label}</a>', page).group(1))
+
+
+def get(app, client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) <= app.config['QUERY_BUDGET']['main.child']
+    return response.get_data(as_text=True)
+
+
+def test_tasks_and_rewards_page_independently_in_budget(app, client, make_user, make_child):
+    child_id = make_child(make_user())
+    with app.app_context():
+        db.session.add_all([Task(name=f'task-{i}', points_awarded=1, child_id=child_id) for i in range(150)])
+        db.session.add_all([Reward(name=f'reward-{i}', points_required=1, child_id=child_id) for i in range(120)])
+        db.session.commit()
+    login(client)
+
+    first = get(app, client, f'/child/{child_id}')
+    assert shown(first, 'task') == list(range(100))
+    assert shown(first, 'reward') == list(range(100))
+
+    more_tasks = get(app, client, more_link(first, 'More tasks'))
+    assert shown(more_tasks, 'task') == list(range(100, 150))
+    assert shown(more_tasks, 'reward') == list(range(100))
+    assert 'More tasks' not in more_tasks
+
+    more_rewards = get(app, client, more_link(more_tasks, 'More rewards'))
+    assert shown(more_rewards, 'task') == list(range(100, 150))
+    assert shown(more_rewards, 'reward') == list(range(100, 120))
+    assert 'More rewards' not in more_rewards
@@ -0,0 +1,32 @@
+import threading
+from sqlalchemy.exc import TimeoutError
+from playwin import create_app, db
+from tests.conftest import CONFIG, _close_engines
+
+
+def test_sqlite_writer_is_a_single_connection(app):
+    pool = db.get_engine(app).pool
+    assert (pool.size(), pool._max_overflow) == (1, 0)
+    assert db.get_read_engine(app).pool.size() == app.config['SQLALCHEMY_READ_POOL_SIZE']
+
+
+def test_second_writer_waits_for_the_first(app):
+    impatient = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=app.config['SQLALCHEMY_DATABASE_URI'],
+                                SQLALCHEMY_WRITE_POOL_TIMEOUT=0.2))
+    engine = db.get_engine(impatient)
+    errors = []
+
+    def write():
+        try:
+            engine.connect().close()
+        except TimeoutError as e:
+            errors.append(e)
+
+    with engine.connect():
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1
+    write()
+    assert len(errors) == 1
+    _close_engines(impatient)
@@ -0,0 +1,59 @@
+from playwin import db
+from playwin.models import User, Child
+from tests.conftest import login
+
+
+def exists(app, model, id):
+    with app.app_context():
+        return db.session.query(model.id).filter_by(id=id).scalar() is not None
+
+
+def test_account_is_deleted_with_the_password(app, client, make_user):
+    user_id = make_user()
+    login(client)
+    response = client.post('/account/delete', data={'password': 'password'})
+    assert response.status_code == 302 and not exists(app, User, user_id)
+
+
+def test_account_survives_a_wrong_or_missing_password(app, client, make_user):
+    user_id = make_user()
+    login(client)
+    for data in ({}, {'password': 'wrong'}):
+        response = client.post('/account/delete', data=data, follow_redirects=True)
+        assert b'was not deleted' in response.data
+    assert exists(app, User, user_id)
+
+
+def test_child_is_removed_only_with_the_password(app, client, make_user, make_child):
+    child_id = make_child(make_user())
+    login(client)
+    client.post(f'/child/{child_id}/delete', data={'password': 'wrong'})
+    assert exists(app, Child, child_id)
+    client.post(f'/child/{child_id}/delete', data={'password': 'password'})
+    assert not exists(app, Child, child_id)
+
+
+def test_api_deletes_require_the_password(app, client, make_user, make_child):
+    user_id = make_user()
+    child_id = make_child(user_id)
+    login(client)
+    assert client.delete(f'/api/v1/children/{child_id}').status_code == 403
+    assert client.delete(f'/api/v1/children/{child_id}', json={'password': 'password'}).status_code == 204
+    assert client.delete('/api/v1/account', json={'password': 'wrong'}).status_code == 403
+    assert client.delete('/api/v1/account', json={'password': 'password'}).status_code == 204
+    assert not exists(app, User, user_id)
+
+
+def test_cross_site_post_without_csrf_token_is_refused(app, make_user, make_child):
+    app.config['WTF_CSRF_ENABLED'] = True
+    user_id = make_user()
+    child_id = make_child(user_id)
+    client = app.test_client()
+    # logged in without the login form, which now wants a token as well
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    client.post(f'/child/{child_id}/delete', data={'password': 'password'})
+    client.post('/account/delete', data={'password': 'password'})
+    assert exists(app, Child, child_id) and exists(app, User, user_id)
+    assert b'csrf_token' in client.get('/account').data
@@ -0,0 +1,33 @@
+import sys
+import types
+from tests.conftest import login
+
+
+def test_stream_is_off_without_an_async_worker(app, client, make_user, make_child):
+    child_id = make_child(make_user())
+    login(client)
+    assert b'EventSource' not in client.get(f'/child/{child_id}').data
+    assert client.get(f'/child/{child_id}/events').status_code == 404
+    assert client.get(f'/api/v1/children/{child_id}/events').status_code == 404
+
+
+def test_stream_follows_a_patched_gevent_worker(app, client, make_user, make_child, monkeypatch):
+    child_id = make_child(make_user())
+    login(client)
+    monkey = types.ModuleType('gevent.monkey')
+    monkey.is_module_patched = lambda name: name == 'threading'
+    monkeypatch.setitem(sys.modules, 'gevent.monkey', monkey)
+    assert b'EventSource' in client.get(f'/child/{child_id}').data
+
+
+def test_enabled_stream_starts_with_the_balance(app, client, make_user, make_child):
+    app.config['EVENTS_ENABLED'] = True
+    child_id = make_child(make_user(), points=7)
+    login(client)
+    assert b'EventSource' in client.get(f'/child/{child_id}').data
+    response = client.get(f'/child/{child_id}/events')
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    next(chunks)
+    assert next(chunks) == b'event: points\ndata: {"points": 7}\n\n'
+    response.close()
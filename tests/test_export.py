@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import pytest
+from playwin import db
+from playwin.models import User, Post, Task, Reward
+from tests.conftest import login
+
+
+@pytest.fixture
+def account(app, make_user, make_child):
+    user_id = make_user()
+    child_id = make_child(user_id, points=5)
+    other_child_id = make_child(make_user('other'), name='other')
+    app.config['EXPORT_CHUNK_SIZE'] = 1
+    with app.app_context():
+        db.session.add_all([Post(title='first', content='one', user_id=user_id),
+                            Post(title='second', content='two', user_id=user_id),
+                            Task(name='dishes', points_awarded=2, child_id=child_id),
+                            Task(name='not mine', points_awarded=2, child_id=other_child_id),
+                            Reward(name='film', points_required=3, child_id=child_id)])
+        db.session.commit()
+    return user_id, child_id
+
+
+def test_ndjson_tags_every_line_with_its_section(client, account):
+    user_id, child_id = account
+    login(client)
+    response = client.get('/account/export.ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="playwin-parent.ndjson"'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['section'] for line in lines] == [
+        'account', 'posts', 'posts', 'children', 'tasks', 'rewards']
+    assert lines[0]['id'] == user_id and lines[0]['username'] == 'parent'
+    assert [line['title'] for line in lines[1:3]] == ['first', 'second']
+    assert lines[3]['points'] == 5
+    assert lines[4]['name'] == 'dishes' and lines[4]['child_id'] == child_id
+
+
+@pytest.mark.parametrize('section, header, rows', [
+    ('posts', ['id', 'title', 'content', 'date_posted'], [['first', 'one'], ['second', 'two']]),
+    ('tasks', ['id', 'child_id', 'name', 'description', 'points_awarded', 'due_on'], [['dishes']]),
+    ('rewards', ['id', 'child_id', 'name', 'description', 'points_required'], [['film']]),
+    ('points', ['id', 'child_id', 'amount', 'description', 'date_created'], []),
+])
+def test_csv_has_a_header_and_the_section_rows(client, account, section, header, rows):
+    login(client)
+    response = client.get(f'/account/export/{section}.csv')
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == f'attachment; filename="playwin-parent-{section}.csv"'
+    table = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert table[0] == header
+    names = [row[1:3] if section == 'posts' else row[2:3] for row in table[1:]]
+    assert names == rows
+
+
+def test_unknown_section_is_not_found(client, account):
+    login(client)
+    assert client.get('/account/export/passwords.csv').status_code == 404
+    assert client.get('/api/v1/account/export/passwords.csv').status_code == 404
+
+
+def test_api_alias_matches_the_html_route(client, account):
+    login(client)
+    assert client.get('/api/v1/account/export').data == client.get('/account/export.ndjson').data
+    assert client.get('/api/v1/account/export/posts.csv').data == client.get('/account/export/posts.csv').data
+
+
+def test_export_requires_login(client):
+    assert client.get('/account/export.ndjson').status_code == 302
+
+
+def test_non_ascii_username_gets_a_safe_filename(app, client, make_user):
+    make_user('小明')
+    login(client, '小明')
+    response = client.get('/account/export.ndjson')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == (
+        "attachment; filename=\"playwin-.ndjson\"; filename*=UTF-8''playwin-%E5%B0%8F%E6%98%8E.ndjson")
+
+
+def test_quotes_in_the_username_stay_out_of_the_header(app, client, make_user):
+    user_id = make_user()
+    with app.app_context():
+        User.query.get(user_id).username = 'a"b;c'
+        db.session.commit()
+    login(client)
+    response = client.get('/account/export/posts.csv')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == (
+        "attachment; filename=\"playwin-abc-posts.csv\"; filename*=UTF-8''playwin-a%22b%3Bc-posts.csv")
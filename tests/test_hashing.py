@@ -0,0 +1,34 @@
+import pytest
+from playwin import hasher
+from playwin.hashing import HasherBusy, hash_rounds
+
+
+def test_pool_does_not_fork_the_server(app):
+    app.config['HASHER_WORKERS'] = 1
+    hasher.init_app(app)
+    with app.app_context():
+        try:
+            pw_hash = hasher.generate_password_hash('password')
+            assert hasher.check_password_hash(pw_hash, 'password')
+            assert not hasher.check_password_hash(pw_hash, 'wrong')
+            assert app.extensions['hasher'].executor._mp_context.get_start_method() != 'fork'
+        finally:
+            hasher.shutdown(app)
+
+
+def test_rounds_and_rehash(app):
+    with app.app_context():
+        pw_hash = hasher.generate_password_hash('password')
+        assert hash_rounds(pw_hash) == 4
+        assert not hasher.needs_rehash(pw_hash)
+        app.extensions['hasher'].rounds = 5
+        assert hasher.needs_rehash(pw_hash)
+
+
+def test_rejects_work_beyond_max_pending(app):
+    app.config['HASHER_MAX_PENDING'] = 1
+    hasher.init_app(app)
+    with app.app_context():
+        app.extensions['hasher'].slots.acquire()
+        with pytest.raises(HasherBusy):
+            hasher.generate_password_hash('password')
@@ -0,0 +1,65 @@
+import importlib
+import time
+from playwin import db, identity
+from playwin.models import User
+from tests.conftest import login
+
+
+def query_count(client, path='/account'):
+    response = client.get(path)
+    assert response.status_code == 200
+    return int(response.headers['X-Query-Count'])
+
+
+def test_session_only_carries_id_and_version(app, client, make_user):
+    make_user()
+    login(client)
+    with client.session_transaction() as session:
+        assert set(session['_identity']) == {'id', 'version', 'expires'}
+    assert b'parent@demo.com' not in client.get('/account').headers.get('Set-Cookie', '').encode()
+
+
+def test_cached_identity_skips_the_user_query(app, client, make_user):
+    make_user()
+    login(client)
+    cached = query_count(client)
+    with client.session_transaction() as session:
+        del session['_identity']
+    assert query_count(client) == cached + 1
+    assert query_count(client) == cached
+
+
+def test_invalidated_user_is_reloaded(app, client, make_user):
+    user_id = make_user()
+    login(client)
+    cached = query_count(client)
+    with app.test_request_context():
+        user = User.query.get(user_id)
+        user.username = 'renamed'
+        db.session.commit()
+        identity.invalidate(user)
+    response = client.get('/account')
+    assert int(response.headers['X-Query-Count']) == cached + 1
+    assert b'renamed' in response.data
+
+
+def test_deleted_user_is_logged_out(app, client, make_user):
+    user_id = make_user()
+    login(client)
+    with app.test_request_context():
+        user = User.query.get(user_id)
+        identity.invalidate(user)
+        db.session.delete(user)
+        db.session.commit()
+    response = client.get('/account')
+    assert response.status_code == 302 and '/login' in response.headers['Location']
+
+
+def test_cached_profile_expires_after_ttl(app, client, make_user, monkeypatch):
+    make_user()
+    login(client)
+    cached = query_count(client)
+    # playwin.identity is also the IdentityCache instance, so patch the module itself
+    later = time.time() + app.config['IDENTITY_CACHE_TTL'] + 1
+    monkeypatch.setattr(importlib.import_module('playwin.identity').time, 'time', lambda: later)
+    assert query_count(client) == cached + 1
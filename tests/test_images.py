@@ -0,0 +1,67 @@
+import hashlib
+import io
+import os
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from playwin import images
+from playwin.images import SIZES
+
+
+def png(color='red', size=(400, 300)):
+    data = io.BytesIO()
+    Image.new('RGB', size, color).save(data, 'PNG')
+    return data.getvalue()
+
+
+def save(app, data, **kwargs):
+    with app.test_request_context():
+        return images.save(FileStorage(io.BytesIO(data), 'picture.png'), **kwargs)
+
+
+def test_upload_is_named_by_content_and_resized_to_every_variant(app):
+    data = png()
+    ready = []
+    filename = save(app, data, on_ready=lambda: ready.append(True))
+    assert filename == hashlib.sha256(data).hexdigest()[:16] + '.jpg'
+    folder = app.config['IMAGE_FOLDER']
+    with app.app_context():
+        expected = {images.variant(filename, size, fmt) for size in SIZES for fmt in images.formats + [None]}
+    assert set(os.listdir(folder)) == expected
+    with Image.open(os.path.join(folder, images.variant(filename, 64))) as variant:
+        assert max(variant.size) == 64 and variant.format == 'JPEG'
+    assert ready == [True]
+    assert os.listdir(app.config['IMAGE_UPLOAD_FOLDER']) == []
+
+
+def test_same_picture_is_processed_once(app, monkeypatch):
+    first = save(app, png('blue'))
+    processed = []
+    monkeypatch.setattr(images, '_process', lambda *args: processed.append(args))
+    assert save(app, png('blue')) == first
+    assert processed == []
+    assert os.listdir(app.config['IMAGE_UPLOAD_FOLDER']) == []
+
+
+def test_placeholder_is_shown_until_the_variants_exist(app):
+    with app.test_request_context():
+        assert 'profile_pics/default.' in images.picture_url('0123456789abcdef.jpg')
+        assert images.picture_url('0123456789abcdef.jpg', fmt='webp') is None
+    filename = save(app, png('green'))
+    with app.test_request_context():
+        assert filename.split('.')[0] in images.picture_url(filename)
+
+
+def test_upload_is_staged_outside_the_static_folder(app, monkeypatch):
+    staged = []
+    monkeypatch.setattr(images, '_process', lambda app, upload_path, *args: staged.append(upload_path))
+    save(app, png('yellow'))
+    assert os.path.dirname(staged[0]) == app.config['IMAGE_UPLOAD_FOLDER']
+    assert os.listdir(app.config['IMAGE_FOLDER']) == []
+
+
+def test_invalid_upload_leaves_nothing_behind(app):
+    filename = save(app, b'not an image')
+    assert os.listdir(app.config['IMAGE_FOLDER']) == []
+    assert os.listdir(app.config['IMAGE_UPLOAD_FOLDER']) == []
+    with app.test_request_context():
+        assert 'profile_pics/default.' in images.picture_url(filename)
@@ -0,0 +1,158 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from playwin import db, ledger
+from playwin.models import Child, Task, Reward, PointTransaction
+from tests.conftest import login
+
+
+@pytest.fixture
+def family(app, client, make_user, make_child):
+    parent_id = make_user()
+    child_id = make_child(parent_id)
+    login(client)
+    return child_id
+
+
+def add(app, *items):
+    with app.app_context():
+        db.session.add_all(items)
+        db.session.commit()
+        return [item.id for item in items]
+
+
+def balance(app, child_id):
+    with app.app_context():
+        points = db.session.query(Child.points).filter_by(id=child_id).scalar()
+        total = db.session.query(db.func.coalesce(db.func.sum(PointTransaction.amount), 0)).filter_by(
+            child_id=child_id).scalar()
+        return points, total
+
+
+def test_complete_and_buy_move_balance_with_the_ledger(app, client, family):
+    task_id, reward_id = add(app, Task(name='dishes', points_awarded=5, child_id=family),
+                             Reward(name='movie', points_required=3, child_id=family))
+    client.post(f'/child/{family}/task/{task_id}/complete')
+    client.post(f'/child/{family}/reward/{reward_id}/buy')
+    assert balance(app, family) == (2, 2)
+
+
+def test_reward_beyond_balance_is_refused(app, client, family):
+    reward_id, = add(app, Reward(name='bike', points_required=50, child_id=family))
+    client.post(f'/child/{family}/reward/{reward_id}/buy')
+    assert balance(app, family) == (0, 0)
+    with app.app_context():
+        assert Reward.query.get(reward_id) is not None
+
+
+def test_repeated_idempotency_key_counts_once(app, client, family):
+    task_id, = add(app, Task(name='dishes', points_awarded=5, child_id=family))
+    for _ in range(2):
+        client.post(f'/child/{family}/task/{task_id}/complete', data={'idempotency_key': 'same'})
+    assert balance(app, family) == (5, 5)
+
+
+@pytest.mark.parametrize('url, data', [
+    ('/child/{child_id}/task/new', {'name': 'bad', 'points_awarded': -500}),
+    ('/child/{child_id}/reward/new', {'name': 'bad', 'points_required': -500}),
+    ('/child/{child_id}/recurring', {'name': 'bad', 'points_awarded': -500, 'schedule': 'daily'}),
+])
+def test_forms_reject_negative_points(app, client, family, url, data):
+    response = client.post(url.format(child_id=family), data=data)
+    assert response.status_code == 200
+    assert 'Number must be at least 0' in response.get_data(as_text=True)
+    with app.app_context():
+        assert Task.query.count() == Reward.query.count() == 0
+
+
+@pytest.mark.parametrize('url, field', [
+    ('/children/tasks/new', 'points_awarded'),
+    ('/children/rewards/new', 'points_required'),
+])
+def test_batches_reject_negative_points(app, client, family, url, field):
+    response = client.post(url, json={'items': [{'child_id': family, 'name': 'bad', field: -500}]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('url, field', [
+    ('/api/v1/children/{child_id}/tasks', 'points_awarded'),
+    ('/api/v1/children/{child_id}/rewards', 'points_required'),
+])
+def test_api_rejects_negative_points(app, client, family, url, field):
+    response = client.post(url.format(child_id=family), json={'name': 'bad', field: -500})
+    assert response.status_code == 400
+    assert field in response.get_json()['fields']
+
+
+def test_ledger_refuses_negative_amounts_already_stored(app, client, family):
+    task_id, reward_id = add(app, Task(name='bad', points_awarded=-500, child_id=family),
+                             Reward(name='bad', points_required=-500, child_id=family))
+    client.post(f'/child/{family}/task/{task_id}/complete')
+    client.post('/children/tasks/complete', json={'task_ids': [task_id]})
+    client.post(f'/child/{family}/reward/{reward_id}/buy')
+    assert client.post(f'/api/v1/children/{family}/rewards/{reward_id}/buy').status_code == 400
+    assert balance(app, family) == (0, 0)
+    with app.app_context():
+        with pytest.raises(ledger.NegativeAmount):
+            ledger.complete_tasks(Task.query.filter_by(id=task_id).all())
+        db.session.rollback()
+        with pytest.raises(ledger.InsufficientPoints):
+            ledger.record_points(family, -1, 'Adjustment')
+        db.session.rollback()
+
+
+def test_concurrent_completions_and_purchases_keep_the_ledger_consistent(app, family):
+    threads, per_kind = 4, 20
+    rng = random.Random(42)
+    task_ids = add(app, *(Task(name=f'task {i}', points_awarded=rng.randint(1, 5), child_id=family)
+                          for i in range(per_kind)))
+    reward_ids = add(app, *(Reward(name=f'reward {i}', points_required=rng.randint(1, 5), child_id=family)
+                            for i in range(per_kind)))
+    work = [('task', 'complete', item_id) for item_id in task_ids] + \
+        [('reward', 'buy', item_id) for item_id in reward_ids]
+
+    def hammer(seed):
+        client = app.test_client()
+        login(client)
+        statuses = []
+        for kind, action, item_id in random.Random(seed).sample(work, len(work)):
+            statuses.append(client.post(f'/child/{family}/{kind}/{item_id}/{action}').status_code)
+        return statuses
+
+    with ThreadPoolExecutor(threads) as pool:
+        statuses = [status for result in pool.map(hammer, range(threads)) for status in result]
+    assert all(status < 500 for status in statuses)
+    points, total = balance(app, family)
+    assert points == total >= 0
+    with app.app_context():
+        assert Task.query.count() == 0
+        assert db.session.query(PointTransaction.id).filter(PointTransaction.amount > 0).count() == per_kind
+
+
+def test_same_key_from_two_families_does_not_collide(app, client, family, make_user, make_child):
+    task_id, reward_id = add(app, Task(name='dishes', points_awarded=5, child_id=family),
+                             Reward(name='movie', points_required=3, child_id=family))
+    other_client = app.test_client()
+    other = make_child(make_user('neighbour'), name='other')
+    login(other_client, 'neighbour')
+    other_task, other_reward = add(app, Task(name='dishes', points_awarded=5, child_id=other),
+                                   Reward(name='movie', points_required=3, child_id=other))
+    headers = {'Idempotency-Key': 'retry-1'}
+    for http, child_id, task, reward in ((client, family, task_id, reward_id),
+                                         (other_client, other, other_task, other_reward)):
+        assert http.post(f'/api/v1/children/{child_id}/tasks/{task}/complete', headers=headers).status_code == 200
+        assert http.post(f'/api/v1/children/{child_id}/rewards/{reward}/buy', headers=headers).status_code == 200
+        assert balance(app, child_id) == (2, 2)
+
+
+def test_retried_api_calls_replay_the_first_result(app, client, family):
+    task_id, reward_id = add(app, Task(name='dishes', points_awarded=5, child_id=family),
+                             Reward(name='movie', points_required=3, child_id=family))
+    headers = {'Idempotency-Key': 'retry-1'}
+    for url in (f'/api/v1/children/{family}/tasks/{task_id}/complete',
+                f'/api/v1/children/{family}/rewards/{reward_id}/buy'):
+        first = client.post(url, headers=headers).get_json()
+        assert client.post(url, headers=headers).get_json()['points'] == first['points']
+    assert client.post(f'/api/v1/children/{family}/rewards/{reward_id}/buy',
+                       headers={'Idempotency-Key': 'other'}).status_code == 404
+    assert balance(app, family) == (2, 2)
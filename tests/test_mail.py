@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timedelta
+from playwin import create_app, db, mail_dispatcher
+from playwin.models import OutgoingMail
+from tests.conftest import CONFIG
+
+
+def queue(app, *recipients):
+    with app.app_context():
+        db.session.add_all([OutgoingMail(subject='Hello', sender='noreply@demo.com', recipients=recipient,
+                                         body='body') for recipient in recipients])
+        db.session.commit()
+
+
+def mails(app):
+    with app.app_context():
+        return {mail.recipients: (mail.attempts, mail.sent_at is not None, mail.next_attempt, mail.last_error)
+                for mail in OutgoingMail.query.all()}
+
+
+def make_due(app):
+    with app.app_context():
+        OutgoingMail.query.filter(OutgoingMail.next_attempt.isnot(None)).update(
+            {OutgoingMail.next_attempt: datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+
+def test_reset_request_delivers_a_link(app, client, make_user):
+    make_user()
+    response = client.post('/reset_password', data={'email': 'parent@demo.com'})
+    assert response.status_code == 302
+    outbox = app.extensions['mail_sink'].outbox
+    assert [message.recipients for message in outbox] == [['parent@demo.com']]
+    assert 'http://localhost/reset_password/' in outbox[0].body
+    assert mails(app)['parent@demo.com'][:2] == (0, True)
+
+
+def test_refused_connection_backs_off_then_retries(app):
+    sink = app.extensions['mail_sink']
+    app.config['MAIL_RETRY_DELAY'] = 30
+    queue(app, 'a@demo.com')
+    sink.refuse_connections = True
+    before = datetime.utcnow()
+    with app.app_context():
+        assert mail_dispatcher.dispatch_pending() == 1
+        assert mail_dispatcher.dispatch_pending() == 0
+    attempts, sent, next_attempt, error = mails(app)['a@demo.com']
+    assert (attempts, sent) == (1, False)
+    assert next_attempt >= before + timedelta(seconds=30)
+    assert 'refusing' in error
+
+    make_due(app)
+    with app.app_context():
+        mail_dispatcher.dispatch_pending()
+    attempts, _, next_attempt, _ = mails(app)['a@demo.com']
+    assert attempts == 2 and next_attempt >= datetime.utcnow() + timedelta(seconds=59)
+
+    sink.refuse_connections = False
+    make_due(app)
+    with app.app_context():
+        mail_dispatcher.dispatch_pending()
+    assert mails(app)['a@demo.com'][:3] == (2, True, None)
+    assert len(sink.outbox) == 1
+
+
+def test_gives_up_after_max_attempts(app):
+    app.extensions['mail_sink'].refuse_connections = True
+    app.config['MAIL_MAX_ATTEMPTS'] = 3
+    queue(app, 'a@demo.com')
+    for _ in range(3):
+        with app.app_context():
+            mail_dispatcher.dispatch_pending()
+        make_due(app)
+    assert mails(app)['a@demo.com'][:3] == (3, False, None)
+
+
+def test_refused_recipient_does_not_hold_back_the_batch(app):
+    sink = app.extensions['mail_sink']
+    sink.failing_recipients.add('b@demo.com')
+    queue(app, 'a@demo.com', 'b@demo.com', 'c@demo.com')
+    with app.app_context():
+        assert mail_dispatcher.dispatch_pending() == 3
+    state = mails(app)
+    assert state['a@demo.com'][:2] == state['c@demo.com'][:2] == (0, True)
+    assert state['b@demo.com'][:2] == (1, False)
+    assert sink.connections == 1
+
+
+def test_delivers_in_batches_over_one_connection_each(app):
+    sink = app.extensions['mail_sink']
+    app.config['MAIL_BATCH_SIZE'] = 2
+    queue(app, *(f'{i}@demo.com' for i in range(5)))
+    with app.app_context():
+        batches = []
+        while True:
+            sent = mail_dispatcher.dispatch_pending()
+            if not sent:
+                break
+            batches.append(sent)
+    assert batches == [2, 2, 1]
+    assert sink.connections == 3
+    assert len(sink.outbox) == 5
+
+
+def test_worker_starts_with_the_app(app):
+    queue(app, 'a@demo.com')
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    restarted = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=uri, MAIL_ASYNC=True))
+    restarted.test_client().get('/about')
+    deadline = time.monotonic() + 5
+    while not restarted.extensions['mail_sink'].outbox and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [message.recipients for message in restarted.extensions['mail_sink'].outbox] == [['a@demo.com']]
+
+
+def test_dropped_connection_releases_the_rest_of_the_batch(app):
+    sink = app.extensions['mail_sink']
+    sink.disconnect_after = 1
+    queue(app, 'a@demo.com', 'b@demo.com', 'c@demo.com', 'd@demo.com')
+    with app.app_context():
+        assert mail_dispatcher.dispatch_pending() == 4
+    states = sorted(state[:2] for state in mails(app).values())
+    assert states == [(0, False), (0, False), (0, True), (1, False)]
+    released = [state for state in mails(app).values() if state[:2] == (0, False)]
+    assert all(next_attempt <= datetime.utcnow() for _, _, next_attempt, _ in released)
+
+    sink.disconnect_after = None
+    make_due(app)
+    with app.app_context():
+        while mail_dispatcher.dispatch_pending():
+            pass
+    assert sorted(state[:2] for state in mails(app).values()) == [(0, True), (0, True), (0, True), (1, True)]
+    assert sink.connections == 2
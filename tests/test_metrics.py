@@ -0,0 +1,69 @@
+import time
+import pytest
+from playwin import create_app
+from tests.conftest import CONFIG, _close_engines
+
+
+def _metrics(client, **headers):
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == 200
+    return response.get_data(as_text=True).splitlines()
+
+
+def test_exposition_format(client):
+    assert client.get('/login').status_code == 200
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    lines = response.get_data(as_text=True).splitlines()
+    assert '# TYPE playwin_requests_total counter' in lines
+    assert 'playwin_requests_total{endpoint="main.login",method="GET",status="200"} 1' in lines
+    assert '# TYPE playwin_request_duration_seconds histogram' in lines
+    assert 'playwin_request_duration_seconds_bucket{endpoint="main.login",le="+Inf"} 1' in lines
+    assert 'playwin_request_duration_seconds_count{endpoint="main.login"} 1' in lines
+    assert any(line.startswith('playwin_section_seconds_total{endpoint="main.login",section="template"} ')
+               for line in lines)
+
+
+def test_metrics_are_kept_per_app(app, client):
+    client.get('/login')
+    other = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=app.config['SQLALCHEMY_DATABASE_URI']))
+    assert not any(line.startswith('playwin_requests_total{') for line in _metrics(other.test_client()))
+    _close_engines(other)
+
+
+def test_unhandled_exception_counts_as_500(app, client):
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+    assert 'playwin_requests_total{endpoint="boom",method="GET",status="500"} 1' in _metrics(client)
+
+
+def test_token_is_required_when_configured(app, client):
+    app.config['METRICS_TOKEN'] = 'secret'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert _metrics(client, Authorization='Bearer secret')
+
+
+def test_profiler_writes_slow_requests(app, tmp_path):
+    folder = tmp_path / 'profiles'
+    profiled = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=app.config['SQLALCHEMY_DATABASE_URI'],
+                               PROFILER_ENABLED=True, PROFILER_THRESHOLD=0.2, PROFILER_FOLDER=str(folder)))
+
+    @profiled.route('/slow')
+    def slow():
+        time.sleep(0.3)
+        return ''
+
+    client = profiled.test_client()
+    client.get('/login')
+    assert not folder.exists()
+    client.get('/slow')
+    profile, = folder.iterdir()
+    assert profile.name.endswith('.folded') and '-slow-' in profile.name
+    assert any(line.split(';')[-1].startswith('slow (test_metrics.py:') for line in profile.read_text().splitlines())
+    _close_engines(profiled)
@@ -0,0 +1,60 @@
+import importlib.util
+import re
+from pathlib import Path
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+from playwin import create_app, db
+from tests.conftest import CONFIG, _close_engines
+
+
+def test_migrations_create_every_model(app):
+    with app.app_context(), db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={'render_as_batch': True})
+        # the FTS5 index and its shadow tables are created by hand, not from the models
+        diff = [change for change in compare_metadata(context, db.metadata)
+                if not (change[0] == 'remove_table' and change[1].name.startswith('post_fts'))]
+    assert diff == []
+
+
+def test_upgrade_keeps_tables_created_before_the_migrations(tmp_path):
+    app = create_app(dict(CONFIG, SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "old.db"}'))
+    directory = app.extensions['migrate'].directory
+    with app.app_context():
+        upgrade(directory=directory, revision='e448de6b13db')
+        # what db.create_all() added to the bundled database before the migrations existed
+        db.engine.execute('CREATE TABLE outgoing_mail (id INTEGER PRIMARY KEY, subject VARCHAR(255) NOT NULL, '
+                          'sender VARCHAR(120) NOT NULL, recipients TEXT NOT NULL, body TEXT NOT NULL, '
+                          'attempts INTEGER NOT NULL, next_attempt DATETIME, sent_at DATETIME, '
+                          'last_error VARCHAR(255))')
+        db.engine.execute("INSERT INTO outgoing_mail (subject, sender, recipients, body, attempts) "
+                          "VALUES ('Reset', 'a@demo.com', 'b@demo.com', '', 0)")
+        upgrade(directory=directory)
+        assert db.engine.execute('SELECT count(*) FROM outgoing_mail').scalar() == 1
+        indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('outgoing_mail')}
+        assert 'ix_outgoing_mail_next_attempt' in indexes
+        assert 'point_transaction' in db.inspect(db.engine).get_table_names()
+    _close_engines(app)
+
+
+def _revision(revision_id):
+    path, = (Path(__file__).parent.parent / 'migrations' / 'versions').glob(f'{revision_id}_*.py')
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, path
+
+
+def test_cascade_migration_drops_the_keys_postgresql_has():
+    cascade, path = _revision('4d57484e83bf')
+    names = {(table, column): cascade._existing_name('postgresql', table, column, referred)
+             for table, column, referred, _ in cascade.FOREIGN_KEYS}
+    assert names[('child', 'parent_id')] == 'child_parent_id_fkey'
+    assert names[('task_template', 'child_id')] == 'task_template_child_id_fkey'
+    assert names[('task', 'template_id')] == 'fk_task_template_id_task_template'
+    # every key an earlier migration named itself is dropped under that name
+    named = {name for other in path.parent.glob('*.py') if other != path
+             for name in re.findall(r"create_foreign_key\('(\w+)'", other.read_text())}
+    assert named and named <= set(names.values())
+    assert all(cascade._existing_name('sqlite', table, column, referred) == f'fk_{table}_{column}_{referred}'
+               for table, column, referred, _ in cascade.FOREIGN_KEYS)
@@ -0,0 +1,61 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from playwin import db
+from playwin.models import Post
+from playwin.querycount import QueryBudgetExceeded
+from tests.conftest import login
+
+
+@pytest.fixture
+def posts(app, make_user):
+    authors = [make_user(f'author{i}') for i in range(3)]
+    with app.app_context():
+        start = datetime(2020, 1, 1)
+        db.session.add_all([Post(title=f'post {i}', content='content', user_id=authors[i % 3],
+                                 date_posted=start + timedelta(minutes=i)) for i in range(12)])
+        db.session.commit()
+    return authors
+
+
+def query_count(response):
+    assert response.status_code == 200
+    return int(response.headers['X-Query-Count'])
+
+
+def test_feed_within_budget(app, client, posts):
+    budget = app.config['QUERY_BUDGET']['main.home']
+    assert query_count(client.get('/home')) <= budget
+    login(client, 'author0')
+    first = client.get('/home')
+    assert query_count(first) <= budget
+    older = re.search(r'href="(/home\?after=[^"]+)"', first.get_data(as_text=True)).group(1)
+    second = client.get(older)
+    assert query_count(second) <= budget
+    assert 'post 6' in second.get_data(as_text=True)
+
+
+def test_post_within_budget(app, client, posts):
+    budget = app.config['QUERY_BUDGET']['main.post']
+    assert query_count(client.get('/post/1')) <= budget
+    login(client, 'author1')
+    assert query_count(client.get('/post/2')) <= budget
+
+
+def test_user_posts_within_budget(app, client, posts):
+    budget = app.config['QUERY_BUDGET']['main.user_posts']
+    assert query_count(client.get('/user/author0')) <= budget
+    login(client, 'author2')
+    assert query_count(client.get('/user/author2')) <= budget
+
+
+def test_budget_fails_the_request_under_testing(app, client, posts):
+    app.config['QUERY_BUDGET'] = {'main.user_posts': 1}
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/user/author0')
+
+
+def test_count_restarts_with_each_request(app, client, posts):
+    with app.app_context():
+        counts = [query_count(client.get('/user/author0')) for _ in range(3)]
+    assert counts[0] == counts[1] == counts[2]
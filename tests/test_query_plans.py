@@ -0,0 +1,21 @@
+from playwin import queryplan
+
+
+def test_every_route_query_uses_an_index(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+    assert result.exit_code == 0, result.output
+    assert 'All route queries use an index.' in result.output
+
+
+def test_a_route_that_errors_fails_the_check(app, monkeypatch):
+    monkeypatch.setattr(queryplan, 'ROUTES', [('GET', '/post/0')])
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+    assert result.exit_code == 1
+    assert 'GET /post/0: HTTP 404' in result.output
+
+
+def test_full_scans_flags_unindexed_lookups(app):
+    from playwin import db
+    with app.app_context(), db.engine.connect() as connection:
+        assert queryplan.full_scans(connection, {'post'}, 'SELECT * FROM post WHERE title = ?', ('title',))
+        assert not queryplan.full_scans(connection, {'post'}, 'SELECT * FROM post WHERE id = ?', (1,))
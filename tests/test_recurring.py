@@ -0,0 +1,117 @@
+import importlib
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.exc import IntegrityError
+from playwin import db, recurring
+from playwin.models import Task, TaskTemplate
+from playwin.recurring import Schedule, ScheduleError, _values, normalize
+
+MONDAY = date(2024, 1, 1)
+
+
+def test_values_expand_ranges_steps_and_lists():
+    assert _values('1-10/3', 'day of month', 1, 31) == {1, 4, 7, 10}
+    assert _values('*/15', 'day of month', 1, 31) == {1, 16, 31}
+    assert _values('25/3', 'day of month', 1, 31) == {25, 28, 31}
+    assert _values('1,6-7', 'month', 1, 12) == {1, 6, 7}
+
+
+@pytest.mark.parametrize('text', ['0', '13', '3-1', '*/0', 'x', '1-'])
+def test_values_reject_bad_fields(text):
+    with pytest.raises(ScheduleError):
+        _values(text, 'month', 1, 12)
+
+
+def test_seven_is_sunday():
+    assert Schedule('* * 7').weekdays == {0}
+    assert Schedule('* * 7').matches(MONDAY + timedelta(days=6))
+    assert not Schedule('* * 7').matches(MONDAY)
+
+
+def test_day_of_month_or_day_of_week():
+    first_or_monday = Schedule('1 * 1')
+    assert first_or_monday.matches(date(2024, 2, 1))  # a Thursday
+    assert first_or_monday.matches(date(2024, 1, 8))  # a Monday
+    assert not first_or_monday.matches(date(2024, 1, 2))
+    assert not Schedule('1 * *').matches(date(2024, 1, 8))
+    assert not Schedule('* * 1').matches(date(2024, 2, 1))
+
+
+def test_normalize():
+    assert normalize(' Weekly ', MONDAY + timedelta(days=2)) == '* * 3'
+    assert normalize('DAILY', MONDAY) == '* * *'
+    assert normalize('29 2 *', MONDAY) == '29 2 *'
+    with pytest.raises(ScheduleError, match='never comes round'):
+        normalize('31 2 *', MONDAY)
+    with pytest.raises(ScheduleError):
+        normalize('1 *', MONDAY)
+
+
+@pytest.fixture
+def template(app, make_user, make_child):
+    child_id = make_child(make_user())
+    with app.app_context():
+        template = TaskTemplate(name='chore', points_awarded=2, child_id=child_id, schedule='* * *', next_due=MONDAY)
+        db.session.add(template)
+        db.session.commit()
+        return template.id
+
+
+def _state(template_id):
+    tasks = Task.query.filter_by(template_id=template_id).order_by(Task.due_on).all()
+    return [task.due_on for task in tasks], TaskTemplate.query.get(template_id).next_due
+
+
+def test_materialize_is_idempotent(app, template):
+    with app.app_context():
+        assert recurring.materialize(MONDAY) == 1
+        assert recurring.materialize(MONDAY) == 0
+        assert _state(template) == ([MONDAY], MONDAY + timedelta(days=1))
+
+
+def test_open_instance_is_not_stacked(app, template):
+    tuesday, wednesday = MONDAY + timedelta(days=1), MONDAY + timedelta(days=2)
+    with app.app_context():
+        recurring.materialize(MONDAY)
+        assert recurring.materialize(tuesday) == 0
+        assert _state(template) == ([MONDAY], wednesday)
+        Task.query.filter_by(template_id=template).delete()
+        db.session.commit()
+        assert recurring.materialize(wednesday) == 1
+        assert _state(template) == ([wednesday], wednesday + timedelta(days=1))
+
+
+def test_racing_schedulers_hit_the_unique_constraint(app, template):
+    with app.app_context():
+        recurring.materialize(MONDAY)
+        child_id = TaskTemplate.query.get(template).child_id
+        db.session.add(Task(name='chore', points_awarded=2, child_id=child_id, template_id=template, due_on=MONDAY))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+class Stop(Exception):
+    pass
+
+
+def test_run_skips_a_batch_another_scheduler_created(app, template, monkeypatch):
+    def lose_the_race(today=None):
+        db.session.add_all([Task(name='chore', child_id=TaskTemplate.query.get(template).child_id,
+                                 template_id=template, due_on=MONDAY) for _ in range(2)])
+        db.session.commit()
+
+    def stop(seconds):
+        raise Stop()
+
+    logged = []
+    monkeypatch.setattr(recurring, 'materialize', lose_the_race)
+    monkeypatch.setattr(app.logger, 'info', lambda *args: logged.append('info'))
+    monkeypatch.setattr(app.logger, 'exception', lambda *args: logged.append('exception'))
+    monkeypatch.setattr(importlib.import_module('playwin.recurring'), 'time', SimpleNamespace(sleep=stop))
+    with pytest.raises(Stop):
+        recurring._run(app)
+    assert logged == ['info']
+    with app.app_context():
+        assert _state(template) == ([], MONDAY)
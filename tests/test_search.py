@@ -0,0 +1,41 @@
+from sqlalchemy.dialects import postgresql
+from playwin import db, post_search
+from playwin.models import Post
+
+
+def add_posts(app, user_id, *texts):
+    with app.app_context():
+        db.session.add_all(Post(title=title, content=content, user_id=user_id) for title, content in texts)
+        db.session.commit()
+
+
+def titles(app, query, dialect='sqlite'):
+    with app.test_request_context():
+        return [row.title for row in post_search.query(dialect, query.split()).all()]
+
+
+def test_every_match_is_ranked_by_default(app, make_user):
+    add_posts(app, make_user(), ('garden', 'tomatoes'), ('kitchen', 'a garden salad'), ('garage', 'tools'))
+    assert titles(app, 'garden') == ['garden', 'kitchen']
+    app.config['SEARCH_RANK_WINDOW'] = 1
+    assert titles(app, 'garden') == ['kitchen']
+
+
+def test_search_page_highlights_and_ands_terms(app, client, make_user):
+    add_posts(app, make_user(), ('one', 'red apples'), ('two', 'red pears'))
+    response = client.get('/search?q=red+apples')
+    assert b'<mark>apples</mark>' in response.data and b'pears' not in response.data
+
+
+def test_other_databases_fall_back_to_like(app, make_user):
+    add_posts(app, make_user(), ('older', 'snake_case garden'), ('newer', 'a garden of snakes'),
+              ('other', 'snakeXcase'))
+    assert titles(app, 'garden', dialect='mysql') == ['newer', 'older']
+    assert titles(app, 'snake_case', dialect='mysql') == ['older']
+
+
+def test_postgresql_uses_tsvector_ranking(app):
+    with app.test_request_context():
+        sql = str(post_search.query('postgresql', ['garden']).statement.compile(dialect=postgresql.dialect()))
+    assert '@@ plainto_tsquery' in sql and 'ts_rank' in sql and 'post_fts' not in sql
+    assert "setweight(to_tsvector('english', post.title), 'A')" in sql
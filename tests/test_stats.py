@@ -0,0 +1,43 @@
+from datetime import date, datetime, timedelta
+from playwin import db, ledger, stats
+from playwin.models import Task, Reward, StatsRollup, StatsStreak
+
+
+def snapshot():
+    rollups = {(row.scope, row.owner_id, row.period, row.start): tuple(getattr(row, field)
+                                                                       for field in stats.STATS_FIELDS)
+               for row in StatsRollup.query}
+    streaks = {(row.scope, row.owner_id): (row.current_streak, row.longest_streak, row.last_active)
+               for row in StatsStreak.query}
+    return rollups, streaks
+
+
+def test_streak_upsert_keeps_the_longest_run(app, make_user, make_child):
+    child_id = make_child(make_user())
+    first = date(2026, 3, 2)
+    with app.app_context():
+        for day in (first, first + timedelta(days=1), first + timedelta(days=2), first + timedelta(days=2),
+                    first + timedelta(days=5)):
+            stats.record({child_id: stats.Delta(1, 0, 1, 0)}, day)
+        streak = StatsStreak.query.get(('child', child_id))
+        assert (streak.current_streak, streak.longest_streak) == (1, 3)
+    assert 'max(' not in str(stats.STREAK_UPSERT).lower()
+
+
+def test_rebuild_reads_the_kind_not_the_description(app, make_user, make_child):
+    child_id = make_child(make_user())
+    with app.app_context():
+        db.session.add_all([Task(name='dishes', points_awarded=5, child_id=child_id),
+                            Reward(name='Completed puzzle', points_required=2, child_id=child_id)])
+        db.session.commit()
+        ledger.complete_tasks(Task.query.all())
+        ledger.buy_reward(Reward.query.one())
+        ledger.record_points(child_id, 4, 'Completed chores bonus')
+        db.session.commit()
+        incremental = snapshot()
+        assert incremental[0][('child', child_id, 'total', stats.TOTAL)] == (5, 2, 1, 1)
+
+        assert stats.rebuild() == 1
+        assert snapshot() == incremental
+        assert isinstance(next(iter(incremental[1].values()))[2], date)
+        assert datetime.utcnow().date() in {start for _, _, _, start in incremental[0]}